@@ -0,0 +1,284 @@
+"""
+Shape-aware collision tests.
+
+The broad phase uses pygame's C-level Rect.collidelistall() to find candidate
+pairs whose bounding rects overlap. The narrow phase then runs the exact test
+for each pair's shape combination (rect-rect, circle-circle, circle-rect), in
+batches: pairs are grouped by combination and each group is tested with one
+kernel over parallel coordinate arrays.
+
+Projectiles use the swept variants below so that fast movers cannot tunnel
+through thin targets between two simulation steps.
+"""
+
+import pygame
+
+
+def rects_overlap(ax, ay, aw, ah, bx, by, bw, bh):
+    """Axis-aligned rectangle test. Touching edges do not count, matching Rect.colliderect."""
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+def circles_overlap(ax, ay, ar, bx, by, br):
+    """Circle-circle test on centers and radii."""
+    dx = ax - bx
+    dy = ay - by
+    reach = ar + br
+    return dx * dx + dy * dy < reach * reach
+
+
+def circle_rect_overlap(cx, cy, r, rx, ry, rw, rh):
+    """Circle-rectangle test: distance from the circle center to the closest point of the rect."""
+    dx = cx - min(max(cx, rx), rx + rw)
+    dy = cy - min(max(cy, ry), ry + rh)
+    return dx * dx + dy * dy < r * r
+
+
+def rects_overlap_batch(ax, ay, aw, ah, bx, by, bw, bh):
+    """Batched rects_overlap over parallel coordinate sequences. Returns a list of bools."""
+    return [
+        x1 < x2 + w2 and x2 < x1 + w1 and y1 < y2 + h2 and y2 < y1 + h1
+        for x1, y1, w1, h1, x2, y2, w2, h2 in zip(ax, ay, aw, ah, bx, by, bw, bh)
+    ]
+
+
+def circles_overlap_batch(ax, ay, ar, bx, by, br):
+    """Batched circles_overlap over parallel coordinate sequences. Returns a list of bools."""
+    return [
+        (x1 - x2) * (x1 - x2) + (y1 - y2) * (y1 - y2) < (r1 + r2) * (r1 + r2)
+        for x1, y1, r1, x2, y2, r2 in zip(ax, ay, ar, bx, by, br)
+    ]
+
+
+def circle_rect_overlap_batch(cx, cy, cr, rx, ry, rw, rh):
+    """Batched circle_rect_overlap over parallel coordinate sequences. Returns a list of bools."""
+    results = []
+    for x, y, r, left, top, w, h in zip(cx, cy, cr, rx, ry, rw, rh):
+        dx = x - min(max(x, left), left + w)
+        dy = y - min(max(y, top), top + h)
+        results.append(dx * dx + dy * dy < r * r)
+    return results
+
+
+def _circle(entity):
+    radius = entity["radius"]
+    return entity["x"] + radius, entity["y"] + radius, radius
+
+
+def _box(entity):
+    rect = entity["rect"]
+    return entity["x"], entity["y"], rect.width, rect.height
+
+
+def entities_overlap(a, b):
+    """Exact overlap test between two entity dicts, dispatched on their shapes."""
+    a_circle = a["shape"] == "circle"
+    b_circle = b["shape"] == "circle"
+    if a_circle and b_circle:
+        return circles_overlap(*_circle(a), *_circle(b))
+    if a_circle:
+        return circle_rect_overlap(*_circle(a), *_box(b))
+    if b_circle:
+        return circle_rect_overlap(*_circle(b), *_box(a))
+    return rects_overlap(*_box(a), *_box(b))
+
+
+def broad_phase_pairs(movers, targets):
+    """
+    Returns (mover_index, target_index) candidate pairs whose bounding rects overlap.
+    Uses Rect.collidelistall so the O(movers * targets) scan runs in C.
+    """
+    target_rects = [target["rect"] for target in targets]
+    pairs = []
+    for mover_index, mover in enumerate(movers):
+        for target_index in mover["rect"].collidelistall(target_rects):
+            pairs.append((mover_index, target_index))
+    return pairs
+
+
+def narrow_phase(pairs, movers, targets):
+    """
+    Filters broad-phase candidate pairs down to exact shape overlaps.
+    Pairs are bucketed by shape combination and each bucket is tested with one
+    batched kernel. Returns the overlapping pairs in their original order.
+    """
+    rect_rect = []
+    circle_circle = []
+    circle_rect = [] # (pair position, circle entity, rect entity)
+    for position, (mover_index, target_index) in enumerate(pairs):
+        mover = movers[mover_index]
+        target = targets[target_index]
+        mover_circle = mover["shape"] == "circle"
+        target_circle = target["shape"] == "circle"
+        if mover_circle and target_circle:
+            circle_circle.append((position, mover, target))
+        elif mover_circle:
+            circle_rect.append((position, mover, target))
+        elif target_circle:
+            circle_rect.append((position, target, mover))
+        else:
+            rect_rect.append((position, mover, target))
+
+    hits = [False] * len(pairs)
+    if rect_rect:
+        a = [_box(first) for _, first, _ in rect_rect]
+        b = [_box(second) for _, _, second in rect_rect]
+        results = rects_overlap_batch(*zip(*a), *zip(*b))
+        for (position, _, _), hit in zip(rect_rect, results):
+            hits[position] = hit
+    if circle_circle:
+        a = [_circle(first) for _, first, _ in circle_circle]
+        b = [_circle(second) for _, _, second in circle_circle]
+        results = circles_overlap_batch(*zip(*a), *zip(*b))
+        for (position, _, _), hit in zip(circle_circle, results):
+            hits[position] = hit
+    if circle_rect:
+        circles = [_circle(circle) for _, circle, _ in circle_rect]
+        boxes = [_box(box) for _, _, box in circle_rect]
+        results = circle_rect_overlap_batch(*zip(*circles), *zip(*boxes))
+        for (position, _, _), hit in zip(circle_rect, results):
+            hits[position] = hit
+
+    return [pair for pair, hit in zip(pairs, hits) if hit]
+
+
+# Swept (continuous) tests. A mover travelling from its previous to its current
+# position is reduced to a point moving along a segment against the Minkowski sum
+# of both shapes: a rectangle "rounded" by radius r (r = 0 is a plain box,
+# w = h = 0 is a plain circle). Motion is taken relative to the target, so moving
+# targets are handled too. Results are times of impact in [0, 1] or None.
+
+def segment_box_toi(px, py, dx, dy, bx, by, bw, bh):
+    """Slab test of the segment p + t*d (0 <= t <= 1) against a box. Returns the entry time or None."""
+    t_enter = 0.0
+    t_exit = 1.0
+    for start, delta, low, high in ((px, dx, bx, bx + bw), (py, dy, by, by + bh)):
+        if delta == 0:
+            if start <= low or start >= high:
+                return None
+            continue
+        t_low = (low - start) / delta
+        t_high = (high - start) / delta
+        if t_low > t_high:
+            t_low, t_high = t_high, t_low
+        if t_low > t_enter:
+            t_enter = t_low
+        if t_high < t_exit:
+            t_exit = t_high
+        if t_enter >= t_exit:
+            return None
+    return t_enter
+
+
+def segment_circle_toi(px, py, dx, dy, cx, cy, r):
+    """Segment p + t*d (0 <= t <= 1) against a circle. Returns the entry time or None."""
+    fx = px - cx
+    fy = py - cy
+    c = fx * fx + fy * fy - r * r
+    if c < 0:
+        return 0.0 # Already overlapping at the start of the step
+    a = dx * dx + dy * dy
+    if a == 0:
+        return None
+    b = fx * dx + fy * dy
+    discriminant = b * b - a * c
+    if discriminant <= 0:
+        return None
+    t = (-b - discriminant ** 0.5) / a
+    return t if 0.0 <= t <= 1.0 else None
+
+
+def segment_rounded_rect_toi(px, py, dx, dy, rx, ry, rw, rh, r):
+    """Segment against a rectangle rounded by radius r: two expanded boxes plus four corner circles."""
+    if r == 0:
+        return segment_box_toi(px, py, dx, dy, rx, ry, rw, rh)
+    best = None
+    for t in (
+        segment_box_toi(px, py, dx, dy, rx - r, ry, rw + 2 * r, rh),
+        segment_box_toi(px, py, dx, dy, rx, ry - r, rw, rh + 2 * r),
+        segment_circle_toi(px, py, dx, dy, rx, ry, r),
+        segment_circle_toi(px, py, dx, dy, rx + rw, ry, r),
+        segment_circle_toi(px, py, dx, dy, rx, ry + rh, r),
+        segment_circle_toi(px, py, dx, dy, rx + rw, ry + rh, r)
+    ):
+        if t is not None and (best is None or t < best):
+            best = t
+    return best
+
+
+def swept_toi_batch(px, py, dx, dy, rx, ry, rw, rh, rr):
+    """Batched segment_rounded_rect_toi over parallel sequences. Returns a list of times or None."""
+    return [
+        segment_rounded_rect_toi(*args)
+        for args in zip(px, py, dx, dy, rx, ry, rw, rh, rr)
+    ]
+
+
+def swept_rect(entity):
+    """Bounding rect covering an entity's previous and current positions this step."""
+    rect = entity["rect"]
+    left = min(entity["prev_x"], entity["x"])
+    top = min(entity["prev_y"], entity["y"])
+    return pygame.Rect(
+        int(left),
+        int(top),
+        int(abs(entity["x"] - entity["prev_x"]) + rect.width) + 2, # +2 covers rounding on both edges
+        int(abs(entity["y"] - entity["prev_y"]) + rect.height) + 2
+    )
+
+
+def _swept_query(mover, target):
+    """
+    Builds the point-vs-rounded-rect query for a mover/target pair.
+    The point is the mover's center at the start of the step; the rounded rect is
+    the target (at its start position) grown by the mover's extent.
+    """
+    mover_rect = mover["rect"]
+    target_rect = target["rect"]
+    mover_circle = mover["shape"] == "circle"
+    target_circle = target["shape"] == "circle"
+    px = mover["prev_x"] + mover_rect.width / 2
+    py = mover["prev_y"] + mover_rect.height / 2
+    dx = (mover["x"] - mover["prev_x"]) - (target["x"] - target["prev_x"])
+    dy = (mover["y"] - mover["prev_y"]) - (target["y"] - target["prev_y"])
+    tx = target["prev_x"]
+    ty = target["prev_y"]
+
+    if mover_circle and target_circle:
+        radius = target["radius"]
+        return px, py, dx, dy, tx + radius, ty + radius, 0, 0, mover["radius"] + radius
+    if mover_circle:
+        return px, py, dx, dy, tx, ty, target_rect.width, target_rect.height, mover["radius"]
+    half_w = mover_rect.width / 2
+    half_h = mover_rect.height / 2
+    if target_circle:
+        radius = target["radius"]
+        return px, py, dx, dy, tx + radius - half_w, ty + radius - half_h, mover_rect.width, mover_rect.height, radius
+    return px, py, dx, dy, tx - half_w, ty - half_h, target_rect.width + mover_rect.width, target_rect.height + mover_rect.height, 0
+
+
+def swept_broad_phase_pairs(movers, targets):
+    """Like broad_phase_pairs, but on rects swept over each entity's motion this step."""
+    target_rects = [swept_rect(target) for target in targets]
+    pairs = []
+    for mover_index, mover in enumerate(movers):
+        for target_index in swept_rect(mover).collidelistall(target_rects):
+            pairs.append((mover_index, target_index))
+    return pairs
+
+
+def swept_narrow_phase(pairs, movers, targets):
+    """
+    Continuous narrow phase for fast movers. Every candidate pair is turned into a
+    point-vs-rounded-rect query and all queries are tested in one batched kernel.
+    Returns (mover_index, target_index, time_of_impact) for each hit, in pair order.
+    """
+    if not pairs:
+        return []
+    queries = [_swept_query(movers[mover_index], targets[target_index]) for mover_index, target_index in pairs]
+    times = swept_toi_batch(*zip(*queries))
+    return [
+        (mover_index, target_index, t)
+        for (mover_index, target_index), t in zip(pairs, times)
+        if t is not None
+    ]
@@ -0,0 +1,153 @@
+import queue
+import sys
+import threading
+from typing import NamedTuple
+
+
+# Typed game events published by the simulation. Each has a 'kind' used for counters.
+
+class CollisionEvent(NamedTuple):
+    tick: int
+    source_name: str
+    source_type: str
+    target_name: str
+    target_type: str
+    kind = "collision"
+
+
+class DamageEvent(NamedTuple):
+    tick: int
+    source_name: str
+    target_name: str
+    amount: int
+    remaining_health: int
+    kind = "damage"
+
+
+class DestroyedEvent(NamedTuple):
+    tick: int
+    name: str
+    type: str
+    destroyed_by: str
+    kind = "destroyed"
+
+
+class SpawnedEvent(NamedTuple):
+    tick: int
+    name: str
+    type: str
+    kind = "spawned"
+
+
+class ExpiredEvent(NamedTuple):
+    tick: int
+    name: str
+    reason: str # "lifespan" or "offscreen"
+    kind = "expired"
+
+
+EVENT_TYPES = (CollisionEvent, DamageEvent, DestroyedEvent, SpawnedEvent, ExpiredEvent)
+
+
+class EventBus:
+    """
+    In-process event bus. publish() only appends to a buffer and bumps a counter;
+    subscribers receive events in batches when flush() is called (once per frame
+    by the game loop), or automatically once max_buffered events are pending.
+    """
+
+    def __init__(self, max_buffered=1024):
+        self.counts = {event_type.kind: 0 for event_type in EVENT_TYPES}
+        self.max_buffered = max_buffered
+        self._subscribers = [] # (callback, event_types or None for all)
+        self._buffer = []
+
+    def subscribe(self, callback, event_types=None):
+        """Registers callback(list_of_events). event_types limits delivery to those event classes."""
+        self._subscribers.append((callback, tuple(event_types) if event_types else None))
+
+    def unsubscribe(self, callback):
+        self._subscribers = [(cb, types) for cb, types in self._subscribers if cb is not callback]
+
+    def publish(self, event):
+        self.counts[event.kind] = self.counts.get(event.kind, 0) + 1
+        if not self._subscribers:
+            return # Nobody listening: count it, don't buffer it
+        self._buffer.append(event)
+        if len(self._buffer) >= self.max_buffered:
+            self.flush()
+
+    def flush(self):
+        """Delivers all buffered events to subscribers, one batch per subscriber."""
+        if not self._buffer:
+            return
+        batch = self._buffer
+        self._buffer = []
+        for callback, event_types in self._subscribers:
+            if event_types is None:
+                callback(batch)
+            else:
+                selected = [event for event in batch if isinstance(event, event_types)]
+                if selected:
+                    callback(selected)
+
+
+def format_event(event):
+    """Formats an event as the human-readable console line used by the log sink."""
+    if isinstance(event, CollisionEvent):
+        if event.source_type == "projectile":
+            return f"[COLLISION] Projectile '{event.source_name}' hit '{event.target_name}' ({event.target_type})"
+        return f"[COLLISION] {event.source_type.capitalize()} '{event.source_name}' collided with '{event.target_name}' ({event.target_type})"
+    if isinstance(event, DamageEvent):
+        return f"[DAMAGE] '{event.target_name}' took {event.amount} from '{event.source_name}' ({event.remaining_health} left)"
+    if isinstance(event, DestroyedEvent):
+        return f"{event.type.capitalize()} '{event.name}' destroyed."
+    if isinstance(event, SpawnedEvent):
+        return f"[SPAWNED] '{event.name}' ({event.type})"
+    if isinstance(event, ExpiredEvent):
+        return f"[EXPIRED] '{event.name}' ({event.reason})"
+    return str(event)
+
+
+class LogSink:
+    """
+    Event bus subscriber that writes formatted events from a background thread.
+    The game loop only hands over a batch reference; formatting and stream I/O
+    happen off the frame, and multiple pending batches are written in one call.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="event-log-sink", daemon=True)
+        self._thread.start()
+
+    def __call__(self, events):
+        self._queue.put(events)
+
+    def _run(self):
+        running = True
+        while running:
+            batches = [self._queue.get()]
+            while True: # Drain whatever else is already pending into the same write
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for batch in batches:
+                if batch is None:
+                    running = False
+                    continue
+                lines.extend(format_event(event) + "\n" for event in batch)
+            if lines:
+                try:
+                    self.stream.write("".join(lines))
+                    self.stream.flush()
+                except Exception as e:
+                    print(f"Warning: Event log sink failed to write. Error: {e}", file=sys.stderr)
+
+    def close(self):
+        """Writes out everything still pending and stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
@@ -42,6 +42,11 @@ GAME_SCHEMA_DEFINITION = {
                         },
                         "required": ["x", "y"]
                     },
+                    "shape": {
+                        "type": "string",
+                        "enum": ["rectangle", "circle"],
+                        "description": "Optional. Inferred from size when omitted: circle for a radius-only size, rectangle otherwise."
+                    },
                     "size": { "oneOf": [
                             {
                                 "type": "object",
@@ -77,7 +82,7 @@ GAME_SCHEMA_DEFINITION = {
                     "can_shoot": {
                         "type": "boolean",
                         "default": False,
-                        "description": "Determines if the entity can shoot projectiles."
+                        "description": "Determines if the entity can shoot projectiles. The player fires with Space; other entities fire whenever their cooldown allows."
                     },
                     "projectile_archetype": {
                         "type": "object",
@@ -126,6 +131,20 @@ GAME_SCHEMA_DEFINITION = {
                                 "type": "integer",
                                 "minimum": 0,
                                 "description": "Optional. Duration in milliseconds before projectile disappears. 0 or undefined means infinite."
+                            },
+                            "cooldown_ms": {"type": "integer", "minimum": 0, "default": 250},
+                            "direction": {
+                                "type": "object",
+                                "description": "Optional. Firing direction vector, e.g. {\"x\": 0, \"y\": 1} for straight down. Defaults to up for the player and down for other entities.",
+                                "properties": {
+                                    "x": {"type": "number"},
+                                    "y": {"type": "number"}
+                                }
+                            },
+                            "aim_at_player": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Optional. For non-player shooters: fire towards the player's current position."
                             }
                         },
                         "required": ["shape", "size", "color", "speed", "movement_pattern", "damage"]
@@ -139,18 +158,116 @@ GAME_SCHEMA_DEFINITION = {
             "type": "array",
             "items": {"type": "string"},
             "description": "List of simple game rules or objectives."
+        },
+        "spawners": {
+            "type": "array",
+            "description": "Optional. Spawn entities over time from an archetype, continuously and/or in waves.",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string", "minLength": 1},
+                    "entity_archetype": {
+                        "type": "object",
+                        "description": "Entity template for spawned entities. Same fields as an entity, minus id and position.",
+                        "properties": {
+                            "id_prefix": {"type": "string"},
+                            "name_prefix": {"type": "string"},
+                            "type": {"$ref": "#/properties/entities/items/properties/type"},
+                            "color": {"$ref": "#/properties/entities/items/properties/color"},
+                            "shape": {"$ref": "#/properties/entities/items/properties/shape"},
+                            "size": {"$ref": "#/properties/entities/items/properties/size"},
+                            "is_controllable": {"$ref": "#/properties/entities/items/properties/is_controllable"},
+                            "movement_pattern": {"$ref": "#/properties/entities/items/properties/movement_pattern"},
+                            "speed": {"$ref": "#/properties/entities/items/properties/speed"},
+                            "health_points": {"$ref": "#/properties/entities/items/properties/health_points"},
+                            "can_shoot": {"$ref": "#/properties/entities/items/properties/can_shoot"},
+                            "projectile_archetype": {"$ref": "#/properties/entities/items/properties/projectile_archetype"}
+                        },
+                        "required": ["type", "color", "size"]
+                    },
+                    "interval_ms": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Optional. Spawn one entity every interval_ms. Omit for wave-only spawners."
+                    },
+                    "start_ms": {"type": "integer", "minimum": 0, "default": 0},
+                    "end_ms": {"type": "integer", "minimum": 0, "description": "Optional. No spawns after this time."},
+                    "max_alive": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "default": 100,
+                        "description": "Cap on entities from this spawner alive at once. Spawns beyond the cap are skipped."
+                    },
+                    "waves": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "at_ms": {"type": "integer", "minimum": 0},
+                                "count": {"type": "integer", "minimum": 1},
+                                "spacing_ms": {"type": "integer", "minimum": 0, "default": 0}
+                            },
+                            "required": ["at_ms", "count"]
+                        }
+                    },
+                    "spawn_area": {
+                        "type": "object",
+                        "description": "Optional. Horizontal range and y of spawned entities. Defaults to the full width, just above the screen.",
+                        "properties": {
+                            "x_min": {"type": "integer"},
+                            "x_max": {"type": "integer"},
+                            "y": {"type": "integer"}
+                        }
+                    }
+                },
+                "required": ["id", "entity_archetype"]
+            }
         }
     },
     "required": ["game_title", "screen_dimensions", "entities"] # game_rules is optional for now
 }
 
+_game_schema_validator = None
+
+def get_game_schema_validator():
+    """
+    Returns a validator for GAME_SCHEMA_DEFINITION, built (and the definition checked) once.
+    jsonschema.validate() repeats both on every call.
+    """
+    global _game_schema_validator
+    if _game_schema_validator is None:
+        validator_class = jsonschema.validators.validator_for(GAME_SCHEMA_DEFINITION)
+        validator_class.check_schema(GAME_SCHEMA_DEFINITION)
+        _game_schema_validator = validator_class(GAME_SCHEMA_DEFINITION)
+    return _game_schema_validator
+
+_entity_validator = None
+
+def get_entity_validator():
+    """Returns a validator for a single entity (the entities item schema), built once like get_game_schema_validator()."""
+    global _entity_validator
+    if _entity_validator is None:
+        entity_schema = GAME_SCHEMA_DEFINITION["properties"]["entities"]["items"]
+        _entity_validator = type(get_game_schema_validator())(entity_schema)
+    return _entity_validator
+
+def find_schema_error(game_data, validator=None):
+    """
+    Returns the most relevant ValidationError for game_data (as jsonschema.validate would raise), or None if valid.
+    Validates against the whole game schema unless another cached validator is given.
+    """
+    validator = validator or get_game_schema_validator()
+    return jsonschema.exceptions.best_match(validator.iter_errors(game_data))
+
 def validate_game_schema(game_data):
     """
     Validates the given game_data dictionary against the GAME_SCHEMA_DEFINITION.
     Returns True if valid, raises jsonschema.exceptions.ValidationError otherwise.
     """
     try:
-        jsonschema.validate(instance=game_data, schema=GAME_SCHEMA_DEFINITION)
+        error = find_schema_error(game_data)
+        if error is not None:
+            raise error
         print("Schema validation successful.")
         return True
     except jsonschema.exceptions.ValidationError as err:
@@ -162,6 +279,17 @@ def validate_game_schema(game_data):
         print(f"An unexpected error occurred during schema validation: {e}")
         raise
 
+def validate_entity(entity_data):
+    """
+    Validates a single entity dictionary against the entity item schema only.
+    Used to re-check just the entities that changed in an edited schema.
+    Returns True if valid, raises jsonschema.exceptions.ValidationError otherwise.
+    """
+    error = find_schema_error(entity_data, get_entity_validator())
+    if error is not None:
+        raise error
+    return True
+
 if __name__ == '__main__':
     # Example of using the validator with the schema from renderer.py
     # (We'll move DEFAULT_GAME_SCHEMA to a JSON file later)
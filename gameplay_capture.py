@@ -0,0 +1,425 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import pygame
+
+from game_schema_validator import find_schema_error
+from hud import HudCompositor, load_hud_font
+from renderer import draw_live_frame
+from schema_compiler import compile_game_schema
+from simulation import create_world, step_world, scripted_controls, DEFAULT_SIM_HZ
+
+# Headless preview clips: simulates a game for N seconds with scripted input, renders
+# frames offscreen and writes them as an animated GIF or a PNG sequence.
+#
+# Simulation/drawing and encoding overlap. pygame's encoders (and the pure-Python LZW
+# below) hold the GIL, so encoding runs in separate processes rather than threads.
+# Frames are drawn straight into a small ring of shared-memory surfaces (no per-frame
+# copies) and several encoder processes work on consecutive frames at once; a slot is
+# handed back once it is encoded (for GIF: once the next frame, which is diffed against
+# it, is encoded too). The capture only waits when every slot is still in use.
+# GIF frames are drawn onto 8-bit palettized surfaces, so pygame maps colors while
+# drawing and the encoders only have to diff and LZW-compress palette indices; a
+# collector thread in the capturing process writes the encoded frames in order.
+
+DEFAULT_CAPTURE_SECONDS = 10
+DEFAULT_CAPTURE_FPS = 15
+DEFAULT_CAPTURE_SCALE = 1.0
+DEFAULT_ENCODER_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1)) # Leave a core for simulation and drawing
+GIF_PALETTE_SIZE = 256
+
+
+def build_gif_palette(game):
+    """
+    256-color palette for a game: every color the schema uses (so they are exact),
+    white for text and borders, then a 6x6x6 color cube for anything else.
+    """
+    colors = [game.background_color, (255, 255, 255)]
+    for entity in game.entities + tuple(spawner.archetype for spawner in game.spawners):
+        colors.append(entity.color)
+        if entity.projectile_archetype is not None:
+            colors.append(entity.projectile_archetype.color)
+    palette = list(dict.fromkeys(tuple(color) for color in colors))
+    cube = [(r, g, b) for r in range(0, 256, 51) for g in range(0, 256, 51) for b in range(0, 256, 51)]
+    palette.extend(color for color in cube if color not in palette)
+    return palette[:GIF_PALETTE_SIZE]
+
+
+def lzw_encode(indices, min_code_size=8):
+    """GIF variant of LZW: variable-width codes (up to 12 bits), packed LSB first."""
+    clear_code = 1 << min_code_size
+    end_code = clear_code + 1
+    next_code = end_code + 1
+    code_size = min_code_size + 1
+    table = {} # (prefix code << 8) | index -> code
+    output = bytearray()
+    bit_buffer = clear_code
+    bit_count = code_size
+
+    prefix = indices[0]
+    for index in indices[1:]:
+        key = (prefix << 8) | index
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        bit_buffer |= prefix << bit_count
+        bit_count += code_size
+        while bit_count >= 8:
+            output.append(bit_buffer & 0xFF)
+            bit_buffer >>= 8
+            bit_count -= 8
+        if next_code == 4096: # Table full: emit a clear code and start over
+            bit_buffer |= clear_code << bit_count
+            bit_count += code_size
+            next_code = end_code + 1
+            code_size = min_code_size + 1
+            table.clear()
+        else:
+            if next_code >= (1 << code_size):
+                code_size += 1
+            table[key] = next_code
+            next_code += 1
+        prefix = index
+
+    for code in (prefix, end_code):
+        bit_buffer |= code << bit_count
+        bit_count += code_size
+        while bit_count >= 8:
+            output.append(bit_buffer & 0xFF)
+            bit_buffer >>= 8
+            bit_count -= 8
+    if bit_count:
+        output.append(bit_buffer & 0xFF)
+    return bytes(output)
+
+
+def _first_difference(a, b):
+    """Length of the common prefix of two equal-length byte strings (binary search on slice equality)."""
+    low, high = 0, len(a)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def changed_box(previous, current, width, height):
+    """Bounding box (left, top, right, bottom) of the pixels that differ between two frames, or None."""
+    rows = range(height)
+    changed_rows = [row for row in rows if previous[row * width:(row + 1) * width] != current[row * width:(row + 1) * width]]
+    if not changed_rows:
+        return None
+    left = width
+    right = 0
+    for row in changed_rows:
+        old_row = previous[row * width:(row + 1) * width]
+        new_row = current[row * width:(row + 1) * width]
+        left = min(left, _first_difference(old_row, new_row))
+        right = max(right, width - _first_difference(old_row[::-1], new_row[::-1]))
+    return left, changed_rows[0], right, changed_rows[-1] + 1
+
+
+def gif_frame_delay_cs(frame_number, fps):
+    """Delay of one frame in 1/100 s, rounded so the total stays in sync with fps."""
+    return round((frame_number + 1) * 100 / fps) - round(frame_number * 100 / fps)
+
+
+def encode_gif_frame(indices, previous, width, height, delay_cs):
+    """
+    Encodes one frame of palette indices as a GIF graphic control extension and image.
+    With previous (the frame before it), only the rectangle that changed is stored
+    (frames are kept in place, not disposed), so frames can be encoded independently.
+    """
+    if previous is None:
+        box = (0, 0, width, height)
+    else:
+        box = changed_box(previous, indices, width, height)
+        if box is None:
+            # Nothing changed: a 1x1 frame keeps the timing without re-encoding the image
+            box = (0, 0, 1, 1)
+    left, top, right, bottom = box
+    box_width = right - left
+    if box_width == width:
+        pixels = indices[top * width:bottom * width]
+    else:
+        pixels = b"".join(indices[row * width + left:row * width + right] for row in range(top, bottom))
+
+    # Graphic control extension: disposal 1 (keep), delay
+    parts = [
+        b"\x21\xF9\x04\x04" + delay_cs.to_bytes(2, "little") + b"\x00\x00",
+        b"\x2C" + left.to_bytes(2, "little") + top.to_bytes(2, "little")
+        + box_width.to_bytes(2, "little") + (bottom - top).to_bytes(2, "little") + b"\x00",
+        b"\x08"
+    ]
+    data = lzw_encode(pixels)
+    for start in range(0, len(data), 255):
+        block = data[start:start + 255]
+        parts.append(bytes((len(block),)) + block)
+    parts.append(b"\x00")
+    return b"".join(parts)
+
+
+class GifWriter:
+    """Writes an animated GIF from frames encoded by encode_gif_frame(), in display order."""
+
+    def __init__(self, path, width, height, palette, loop=0):
+        self.width = width
+        self.height = height
+        self.frame_count = 0
+        self._file = open(path, 'wb')
+        color_table = bytearray()
+        for color in list(palette) + [(0, 0, 0)] * (GIF_PALETTE_SIZE - len(palette)):
+            color_table.extend(color)
+        self._file.write(b"GIF89a" + width.to_bytes(2, "little") + height.to_bytes(2, "little") + bytes((0xF7, 0, 0)))
+        self._file.write(bytes(color_table))
+        # NETSCAPE2.0 application extension: loop count (0 = forever)
+        self._file.write(b"\x21\xFF\x0BNETSCAPE2.0\x03\x01" + loop.to_bytes(2, "little") + b"\x00")
+
+    def write_encoded_frame(self, frame):
+        self._file.write(frame)
+        self.frame_count += 1
+
+    def close(self):
+        self._file.write(b"\x3B")
+        self._file.close()
+
+
+def _encoder_worker(kind, output_path, slot_names, size, fps, tasks, results):
+    """
+    Encoder process: encodes each queued frame and reports (frame_number, data), where
+    data is the encoded GIF frame, or None once the PNG file is written.
+    """
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            frame_number, slot_index, previous_slot_index = task
+            buffer = slots[slot_index].buf
+            if kind == "gif":
+                previous = bytes(slots[previous_slot_index].buf) if previous_slot_index is not None else None
+                data = encode_gif_frame(bytes(buffer), previous, size[0], size[1], gif_frame_delay_cs(frame_number, fps))
+            else:
+                surface = pygame.image.frombuffer(buffer, size, "RGBX")
+                pygame.image.save(surface, os.path.join(output_path, f"frame_{frame_number:05d}.png"))
+                del surface
+                data = None
+            results.put((frame_number, data))
+    finally:
+        for slot in slots:
+            slot.close()
+
+
+class FramePipeline:
+    """
+    Ring of shared-memory frame surfaces drained by encoder processes.
+    acquire() returns a free (slot_index, surface) to draw into, blocking while the
+    encoders are behind; submit() queues a drawn slot for encoding.
+    """
+
+    def __init__(self, kind, output_path, size, palette=None, fps=DEFAULT_CAPTURE_FPS, workers=DEFAULT_ENCODER_WORKERS, slots=None):
+        self.kind = kind
+        self.size = size
+        self.wait_s = 0.0 # Time spent waiting for a free slot, i.e. encoding-bound time
+        workers = max(1, workers)
+        slots = slots or 2 * workers + 2 # Enough for every worker to be busy while the next frames are drawn
+        self._writer = GifWriter(output_path, size[0], size[1], palette) if kind == "gif" else None
+        bytes_per_pixel = 1 if kind == "gif" else 4
+        self._slots = [shared_memory.SharedMemory(create=True, size=size[0] * size[1] * bytes_per_pixel) for _ in range(slots)]
+        self.surfaces = []
+        for slot in self._slots:
+            surface = pygame.image.frombuffer(slot.buf, size, "P" if kind == "gif" else "RGBX")
+            if kind == "gif":
+                surface.set_palette(palette)
+            self.surfaces.append(surface)
+
+        self._free = queue.Queue()
+        for slot_index in range(slots):
+            self._free.put(slot_index)
+        self._lock = threading.Lock()
+        self._slot_users = [0] * slots # Queued tasks that still read each slot
+        self._task_slots = {} # frame_number -> slots its task reads
+        self._previous_slot = None
+
+        context = multiprocessing.get_context()
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._workers = [
+            context.Process(
+                target=_encoder_worker,
+                args=(kind, output_path, [slot.name for slot in self._slots], size, fps, self._tasks, self._results),
+                daemon=True
+            )
+            for _ in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        self._collector = threading.Thread(target=self._collect, name="capture-collector", daemon=True)
+        self._collector.start()
+
+    def _collect(self):
+        """Collector thread: hands slots back as frames finish and writes GIF frames in order."""
+        encoded = {} # GIF frames that finished ahead of an earlier one
+        next_frame = 0
+        while True:
+            result = self._results.get()
+            if result is None:
+                break
+            frame_number, data = result
+            with self._lock:
+                for slot_index in self._task_slots.pop(frame_number):
+                    self._slot_users[slot_index] -= 1
+                    if self._slot_users[slot_index] == 0:
+                        self._free.put(slot_index)
+            if self._writer is not None:
+                encoded[frame_number] = data
+                while next_frame in encoded:
+                    self._writer.write_encoded_frame(encoded.pop(next_frame))
+                    next_frame += 1
+
+    def acquire(self):
+        start = time.perf_counter()
+        while True:
+            try:
+                slot_index = self._free.get(timeout=1.0)
+                break
+            except queue.Empty:
+                if not self._collector.is_alive() or not all(worker.is_alive() for worker in self._workers):
+                    raise RuntimeError("An encoder process exited unexpectedly.")
+        self.wait_s += time.perf_counter() - start
+        return slot_index, self.surfaces[slot_index]
+
+    def submit(self, slot_index, frame_number):
+        with self._lock:
+            if self.kind == "gif":
+                # The next frame is diffed against this one, so the slot stays in use until that is encoded too
+                self._slot_users[slot_index] = 2
+                previous_slot_index = self._previous_slot
+                self._task_slots[frame_number] = (slot_index,) if previous_slot_index is None else (slot_index, previous_slot_index)
+                self._previous_slot = slot_index
+            else:
+                self._slot_users[slot_index] = 1
+                previous_slot_index = None
+                self._task_slots[frame_number] = (slot_index,)
+        self._tasks.put((frame_number, slot_index, previous_slot_index))
+
+    def close(self):
+        """Waits for the encoders to finish every submitted frame, then releases the shared memory."""
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._results.put(None)
+        self._collector.join()
+        if self._writer is not None:
+            self._writer.close()
+        self.surfaces = [] # Surfaces reference the shared buffers; drop them before closing
+        for slot in self._slots:
+            slot.close()
+            slot.unlink()
+
+
+def capture_gameplay(game_schema, output_path, seconds=DEFAULT_CAPTURE_SECONDS, fps=DEFAULT_CAPTURE_FPS,
+                     scale=DEFAULT_CAPTURE_SCALE, sim_hz=DEFAULT_SIM_HZ, seed=0, workers=DEFAULT_ENCODER_WORKERS):
+    """
+    Simulates a validated schema for seconds of game time with scripted input and writes
+    fps frames per second to output_path: an animated GIF if it ends in .gif, otherwise a
+    directory of numbered PNG files. scale resizes the frames (e.g. 0.5 for half size).
+    Frame n shows the game at (n + 1) / fps seconds, so the clip covers exactly seconds of play.
+    Returns a dict of capture statistics.
+    """
+    if seconds <= 0 or fps <= 0 or scale <= 0 or sim_hz <= 0:
+        raise ValueError("seconds, fps, scale and sim_hz must be positive.")
+    if os.environ.get('SDL_VIDEODRIVER') is None:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy' # Frames are rendered offscreen
+    pygame.init()
+    game = compile_game_schema(game_schema)
+    world = create_world(game, seed)
+    kind = "gif" if output_path.lower().endswith(".gif") else "png"
+    palette = build_gif_palette(game) if kind == "gif" else None
+    if kind == "png":
+        os.makedirs(output_path, exist_ok=True)
+    size = (max(1, round(game.width * scale)), max(1, round(game.height * scale)))
+    frame_count = max(1, round(seconds * fps))
+
+    # Antialiased (per-pixel alpha) text can't blend onto palettized GIF frames
+    hud = HudCompositor(load_hud_font(), antialias=kind != "gif")
+    scratch_rect = pygame.Rect(0, 0, 0, 0)
+    canvas = None
+    if size != (game.width, game.height):
+        canvas = pygame.Surface((game.width, game.height), 0, 8 if kind == "gif" else 32)
+        if kind == "gif":
+            canvas.set_palette(palette)
+    controls_at = scripted_controls(sim_hz)
+    sim_dt = 1.0 / sim_hz
+
+    start = time.perf_counter()
+    pipeline = FramePipeline(kind, output_path, size, palette, fps, workers=workers)
+    try:
+        for frame_number in range(frame_count):
+            # Frame times are computed from the frame number rather than accumulated, so no drift
+            frame_ticks = (frame_number + 1) * sim_hz / fps
+            while world["tick"] < int(frame_ticks + 1e-9):
+                step_world(world, sim_dt, controls_at(world["tick"]))
+            alpha = max(0.0, frame_ticks - world["tick"])
+            slot_index, surface = pipeline.acquire()
+            if canvas is None:
+                draw_live_frame(surface, world, alpha, scratch_rect, hud)
+            else:
+                draw_live_frame(canvas, world, alpha, scratch_rect, hud)
+                if kind == "gif":
+                    pygame.transform.scale(canvas, size, surface) # Nearest neighbour keeps palette indices exact
+                else:
+                    surface.blit(pygame.transform.smoothscale(canvas, size), (0, 0))
+            pipeline.submit(slot_index, frame_number)
+    finally:
+        pipeline.close()
+        pygame.quit()
+    return {
+        "output": output_path,
+        "frames": frame_count,
+        "size": size,
+        "game_seconds": world["time_ms"] / 1000.0,
+        "wall_s": time.perf_counter() - start,
+        "encoder_wait_s": pipeline.wait_s
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render a headless preview clip (GIF or PNG sequence) of a game schema.")
+    parser.add_argument("json_file")
+    parser.add_argument("output", help="Output .gif file, or a directory for a PNG sequence.")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_CAPTURE_SECONDS)
+    parser.add_argument("--fps", type=int, default=DEFAULT_CAPTURE_FPS)
+    parser.add_argument("--scale", type=float, default=DEFAULT_CAPTURE_SCALE)
+    parser.add_argument("--sim_hz", type=int, default=DEFAULT_SIM_HZ)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=DEFAULT_ENCODER_WORKERS, help="Encoder processes.")
+    args = parser.parse_args()
+    if args.sim_hz <= 0:
+        parser.error("--sim_hz must be a positive number of ticks per second.")
+    for option in ("seconds", "fps", "scale"):
+        if getattr(args, option) <= 0:
+            parser.error(f"--{option} must be positive.")
+
+    with open(args.json_file, 'r') as f:
+        game_schema = json.load(f)
+    error = find_schema_error(game_schema)
+    if error is not None:
+        print(f"Error: {args.json_file} is not a valid schema: {error.message}")
+        raise SystemExit(2)
+    stats = capture_gameplay(game_schema, args.output, args.seconds, args.fps, args.scale, args.sim_hz, args.seed, args.workers)
+    print(
+        f"Wrote {stats['frames']} frames ({stats['size'][0]}x{stats['size'][1]}, {stats['game_seconds']:.1f} s of play) "
+        f"to {stats['output']} in {stats['wall_s']:.1f} s ({stats['encoder_wait_s']:.1f} s waiting for the encoder)."
+    )
@@ -0,0 +1,391 @@
+import json
+import re
+
+# Schema generation backends. main.py talks to a backend through two calls:
+#   generate(user_prompt_text)                   -> schema dict or None
+#   correct(correction_prompt, user_prompt_text) -> corrected schema dict or None
+# so the Gemini model, the keyword-based simulation and the local template generator
+# are interchangeable, and a network backend can fall back to a local one.
+
+DEFAULT_GEMINI_MODEL = "gemini-1.5-flash"
+
+TEMPLATE_SCREEN_WIDTH = 800
+TEMPLATE_SCREEN_HEIGHT = 600
+TEMPLATE_BACKGROUND_COLOR = [20, 20, 30]
+TEMPLATE_MAX_COUNT = 200 # Per entity type, to keep generated games playable
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20,
+    "thirty": 30, "forty": 40, "fifty": 50, "hundred": 100, "dozen": 12, "several": 3, "many": 8, "lots": 12
+}
+_COLORS = {
+    "red": [220, 40, 40], "green": [40, 200, 60], "blue": [40, 120, 255], "yellow": [240, 220, 40],
+    "orange": [255, 140, 0], "purple": [150, 60, 200], "pink": [255, 105, 180], "cyan": [0, 220, 220],
+    "white": [240, 240, 240], "gray": [128, 128, 128], "grey": [128, 128, 128], "black": [10, 10, 10],
+    "brown": [140, 90, 40], "gold": [255, 200, 0]
+}
+_SHAPES = {
+    "circle": "circle", "circles": "circle", "ball": "circle", "balls": "circle", "round": "circle", "orb": "circle", "orbs": "circle",
+    "square": "rectangle", "squares": "rectangle", "box": "rectangle", "boxes": "rectangle", "block": "rectangle",
+    "blocks": "rectangle", "rectangle": "rectangle", "rectangles": "rectangle"
+}
+_SHAPE_NOUNS = {"circles", "balls", "orbs", "squares", "boxes", "rectangles"}
+# Nouns that name an entity type. "player" is handled separately: there is always exactly one.
+_ENTITY_NOUNS = {
+    "enemy": "enemy", "enemies": "enemy", "alien": "enemy", "aliens": "enemy", "invader": "enemy", "invaders": "enemy",
+    "monster": "enemy", "monsters": "enemy", "ship": "enemy", "ships": "enemy", "zombie": "enemy", "zombies": "enemy",
+    "obstacle": "obstacle", "obstacles": "obstacle", "rock": "obstacle", "rocks": "obstacle", "meteor": "obstacle",
+    "meteors": "obstacle", "asteroid": "obstacle", "asteroids": "obstacle", "block": "obstacle", "blocks": "obstacle",
+    "coin": "collectible", "coins": "collectible", "gem": "collectible", "gems": "collectible", "star": "collectible",
+    "stars": "collectible", "collectible": "collectible", "collectibles": "collectible",
+    "target": "target", "targets": "target", "platform": "platform", "platforms": "platform"
+}
+_SHOOTER_WORDS = {"shoot", "shoots", "shooter", "shooting", "shot", "shots", "laser", "lasers", "bullet", "bullets", "gun", "blast", "blaster", "fire", "fires"}
+_DODGER_WORDS = {"dodge", "dodger", "dodging", "dodges", "avoid", "avoiding", "avoids", "falling", "fall", "falls", "survive"}
+_LOOKBEHIND = 3 # Words before a noun that may hold its count, color and shape
+_NEGATIONS = {"no", "not", "without", "never", "none", "nothing", "dont", "don", "doesn", "isn", "aren", "cannot", "can"}
+_ARTICLES = {"a", "an"}
+
+
+class GenerationBackend:
+    """Base class for schema generators. Subclasses implement generate() and may override correct()."""
+
+    name = "base"
+
+    def generate(self, user_prompt_text):
+        raise NotImplementedError
+
+    def generate_batch(self, user_prompt_texts):
+        """Returns one schema (or None) per prompt, in order. Backends with a per-call overhead override this."""
+        return [self.generate(user_prompt_text) for user_prompt_text in user_prompt_texts]
+
+    def correct(self, correction_prompt, user_prompt_text=None):
+        """Returns a corrected schema for a failed one. By default, generates again from the user's prompt."""
+        if user_prompt_text:
+            return self.generate(user_prompt_text)
+        return None
+
+
+class CallableBackend(GenerationBackend):
+    """Adapts a pair of plain functions (such as the keyword-based Gemini simulation in main.py) to the backend interface."""
+
+    def __init__(self, name, generate_fn, correct_fn=None):
+        self.name = name
+        self._generate_fn = generate_fn
+        self._correct_fn = correct_fn
+
+    def generate(self, user_prompt_text):
+        return self._generate_fn(user_prompt_text)
+
+    def correct(self, correction_prompt, user_prompt_text=None):
+        if self._correct_fn is None:
+            return super().correct(correction_prompt, user_prompt_text)
+        return self._correct_fn(correction_prompt)
+
+
+def parse_schema_response(response_text):
+    """Extracts the JSON object from a model response, tolerating ```json fences and surrounding text."""
+    text = response_text.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def parse_schema_array_response(response_text, expected_count):
+    """
+    Extracts a JSON array of schemas from a model response. Returns a list of
+    expected_count entries; entries that are missing or not objects are None.
+    """
+    text = response_text.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("[")
+    end = text.rfind("]")
+    schemas = []
+    if start != -1 and end > start:
+        try:
+            schemas = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            schemas = []
+    if not isinstance(schemas, list):
+        schemas = []
+    schemas = [schema if isinstance(schema, dict) else None for schema in schemas[:expected_count]]
+    return schemas + [None] * (expected_count - len(schemas))
+
+
+class GeminiBackend(GenerationBackend):
+    """
+    Generates schemas with the Gemini API. build_prompt(user_prompt_text) returns the full
+    model prompt; build_batch_prompt(user_prompt_texts), if given, returns one prompt asking
+    for a JSON array of schemas, so a batch costs a single request.
+    Requires google-generativeai and an API key configured with genai.configure().
+    Returns None when the call fails or the response holds no JSON object.
+    """
+
+    name = "gemini"
+
+    def __init__(self, build_prompt, model_name=DEFAULT_GEMINI_MODEL, build_batch_prompt=None):
+        self._build_prompt = build_prompt
+        self._build_batch_prompt = build_batch_prompt
+        self.model_name = model_name
+        self._model = None
+
+    def _request(self, prompt):
+        try:
+            if self._model is None:
+                import google.generativeai as genai
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model.generate_content(prompt).text
+        except Exception as e:
+            print(f"Error: Gemini request failed: {e}")
+            return None
+
+    def _ask(self, prompt):
+        response_text = self._request(prompt)
+        return parse_schema_response(response_text) if response_text is not None else None
+
+    def generate(self, user_prompt_text):
+        return self._ask(self._build_prompt(user_prompt_text))
+
+    def generate_batch(self, user_prompt_texts):
+        if self._build_batch_prompt is None or len(user_prompt_texts) == 1:
+            return super().generate_batch(user_prompt_texts)
+        response_text = self._request(self._build_batch_prompt(user_prompt_texts))
+        if response_text is None:
+            return [None] * len(user_prompt_texts)
+        return parse_schema_array_response(response_text, len(user_prompt_texts))
+
+    def correct(self, correction_prompt, user_prompt_text=None):
+        return self._ask(correction_prompt)
+
+
+class FallbackBackend(GenerationBackend):
+    """Tries the primary backend and falls back to another (e.g. a local one) when it returns nothing or raises."""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    def _call(self, method, *args):
+        try:
+            result = getattr(self.primary, method)(*args)
+        except Exception as e:
+            print(f"Warning: Backend '{self.primary.name}' failed: {e}")
+            result = None
+        if result is None:
+            print(f"Falling back to the '{self.fallback.name}' backend.")
+            result = getattr(self.fallback, method)(*args)
+        return result
+
+    def generate(self, user_prompt_text):
+        return self._call("generate", user_prompt_text)
+
+    def generate_batch(self, user_prompt_texts):
+        try:
+            schemas = self.primary.generate_batch(user_prompt_texts)
+        except Exception as e:
+            print(f"Warning: Backend '{self.primary.name}' failed: {e}")
+            schemas = [None] * len(user_prompt_texts)
+        # Only the prompts the primary backend could not answer go to the fallback
+        return [
+            schema if schema is not None else self.fallback.generate(user_prompt_text)
+            for user_prompt_text, schema in zip(user_prompt_texts, schemas)
+        ]
+
+    def correct(self, correction_prompt, user_prompt_text=None):
+        return self._call("correct", correction_prompt, user_prompt_text)
+
+
+def parse_prompt_features(user_prompt_text):
+    """
+    Extracts what the template generator needs from a prompt: the game mode
+    ("shooter" or "dodger"), the player's color and shape, and for each entity type
+    mentioned its count, color and shape (from the few words before the noun).
+    """
+    words = re.findall(r"[a-z]+|\d+", user_prompt_text.lower())
+    word_set = set(words)
+    shooter_score = len(word_set & _SHOOTER_WORDS)
+    dodger_score = len(word_set & _DODGER_WORDS)
+    features = {
+        "mode": "shooter" if shooter_score > dodger_score else "dodger",
+        "player": {"color": None, "shape": None},
+        "entities": {} # type -> {"count", "color", "shape"}
+    }
+    shape_noun_type = "enemy" if features["mode"] == "shooter" else "obstacle"
+    for index, word in enumerate(words):
+        next_word = words[index + 1] if index + 1 < len(words) else None
+        if word == "player" or word in _ENTITY_NOUNS:
+            entity_type = _ENTITY_NOUNS.get(word, "player")
+        elif word in _SHAPE_NOUNS and next_word not in _ENTITY_NOUNS and next_word != "player":
+            entity_type = shape_noun_type # A shape used as the noun itself, e.g. "dodge 5 red circles"
+        else:
+            continue
+        count = None
+        color = None
+        shape = _SHAPES.get(word) # "blocks" names both the type and the shape
+        for previous in reversed(words[max(0, index - _LOOKBEHIND):index]):
+            if previous in _ENTITY_NOUNS or previous == "player":
+                break # Don't borrow the attributes of the previous noun
+            if count is None and previous.isdigit():
+                count = int(previous)
+            elif count is None and number_word_value(previous) is not None:
+                count = number_word_value(previous) # Articles are not counts: "an obstacle dodger"
+            elif color is None and previous in _COLORS:
+                color = _COLORS[previous]
+            elif shape is None and previous in _SHAPES:
+                shape = _SHAPES[previous]
+        entry = features["player"] if entity_type == "player" else features["entities"].setdefault(
+            entity_type, {"count": None, "color": None, "shape": None}
+        )
+        if entity_type != "player" and count is not None:
+            # The largest mention wins: "an obstacle dodger with 12 obstacles" means 12
+            entry["count"] = max(entry["count"] or 0, count)
+        entry["color"] = entry["color"] or color
+        entry["shape"] = entry["shape"] or shape
+    return features
+
+
+def number_word_value(word):
+    """Value of a spelled-out count ("five" -> 5, "dozen" -> 12), or None. Articles don't count."""
+    return None if word in _ARTICLES else _NUMBER_WORDS.get(word)
+
+
+def prompt_key(user_prompt_text):
+    """
+    Hashable summary of the details a generated schema depends on: the
+    parse_prompt_features() result, plus every number, color and negated word in the
+    prompt. Prompts with different keys must not share a schema, however similar
+    their wording ("5 red aliens" / "50 red aliens", "blocks" / "no blocks").
+    """
+    words = re.findall(r"[a-z]+|\d+", user_prompt_text.lower())
+    numbers = sorted(int(word) if word.isdigit() else number_word_value(word) for word in words
+                     if word.isdigit() or number_word_value(word) is not None)
+    colors = sorted({tuple(_COLORS[word]) for word in words if word in _COLORS})
+    negated = []
+    for index, word in enumerate(words):
+        if word in _NEGATIONS and (word != "can" or words[index + 1:index + 2] == ["t"]):
+            following = [next_word for next_word in words[index + 1:index + 3] if next_word != "t"]
+            negated.append(following[0] if following else "")
+    return json.dumps({
+        "features": parse_prompt_features(user_prompt_text),
+        "numbers": numbers,
+        "colors": colors,
+        "negated": sorted(negated)
+    }, sort_keys=True)
+
+
+def _size_for(shape, size):
+    return {"radius": size // 2} if shape == "circle" else {"width": size, "height": size}
+
+
+def _grid_positions(count, size, top, bottom):
+    """Spreads count boxes of the given size evenly over the screen width, in as many rows as needed."""
+    columns = max(1, min(count, (TEMPLATE_SCREEN_WIDTH - 20) // (size + 10)))
+    rows = (count + columns - 1) // columns
+    column_step = (TEMPLATE_SCREEN_WIDTH - size) // max(1, columns) if columns > 1 else 0
+    row_step = max(size + 5, (bottom - top) // max(1, rows))
+    positions = []
+    for number in range(count):
+        row, column = divmod(number, columns)
+        x = 10 + column * column_step if columns > 1 else (TEMPLATE_SCREEN_WIDTH - size) // 2
+        positions.append({"x": min(x, TEMPLATE_SCREEN_WIDTH - size), "y": top + row * row_step})
+    return positions
+
+
+class TemplateBackend(GenerationBackend):
+    """
+    Local, offline generator: composes a schema from the features parsed out of the
+    prompt (entity types, counts, colors, shapes, shooter or dodger mode). Deterministic,
+    needs no network, and always produces a schema that passes validation.
+    """
+
+    name = "template"
+
+    def generate(self, user_prompt_text):
+        features = parse_prompt_features(user_prompt_text)
+        shooter = features["mode"] == "shooter"
+        player_shape = features["player"]["shape"] or "rectangle"
+        player = {
+            "id": "player_1",
+            "name": "player",
+            "type": "player",
+            "shape": player_shape,
+            "color": features["player"]["color"] or [0, 150, 255],
+            "size": _size_for(player_shape, 40),
+            "position": {"x": TEMPLATE_SCREEN_WIDTH // 2 - 20, "y": TEMPLATE_SCREEN_HEIGHT - 80},
+            "is_controllable": True,
+            "movement_pattern": "player_horizontal_control",
+            "speed": 7,
+            "health_points": 5
+        }
+        if shooter:
+            player["can_shoot"] = True
+            player["projectile_archetype"] = {
+                "id_prefix": "bullet_", "name_prefix": "Bullet ", "type": "projectile", "shape": "rectangle",
+                "size": {"width": 4, "height": 12}, "color": [255, 255, 0], "speed": 12,
+                "movement_pattern": "projectile_movement", "damage": 1, "cooldown_ms": 200
+            }
+
+        requested = dict(features["entities"])
+        main_type = "enemy" if shooter else "obstacle"
+        if main_type not in requested:
+            requested[main_type] = {"count": None, "color": None, "shape": None}
+
+        entities = [player]
+        for entity_type, entry in requested.items():
+            count = min(entry["count"] or (5 if entity_type in ("enemy", "obstacle") else 3), TEMPLATE_MAX_COUNT)
+            shape = entry["shape"] or ("circle" if entity_type == "obstacle" else "rectangle")
+            size = 40 if count <= 10 else 24 if count <= 40 else 14
+            color = entry["color"] or {"enemy": [200, 0, 0], "obstacle": [255, 80, 80], "collectible": [255, 215, 0]}.get(entity_type, [0, 200, 0])
+            if entity_type == "platform":
+                positions = _grid_positions(count, size * 3, TEMPLATE_SCREEN_HEIGHT // 3, TEMPLATE_SCREEN_HEIGHT - 140)
+            elif entity_type == "obstacle" and not shooter:
+                positions = _grid_positions(count, size, -TEMPLATE_SCREEN_HEIGHT // 2, 0) # Staggered above the screen
+            else:
+                positions = _grid_positions(count, size, 40, TEMPLATE_SCREEN_HEIGHT // 2)
+            for number, position in enumerate(positions, start=1):
+                entity = {
+                    "id": f"{entity_type}_{number}",
+                    "name": f"{entity_type}_{number}",
+                    "type": entity_type,
+                    "shape": shape,
+                    "color": color,
+                    "size": {"width": size * 3, "height": 12} if entity_type == "platform" else _size_for(shape, size),
+                    "position": position,
+                    "is_controllable": False,
+                    "movement_pattern": "static",
+                    "speed": 0
+                }
+                if entity_type == "enemy":
+                    entity["movement_pattern"] = "falling_down" if not shooter else "moving_left_right_patrol"
+                    entity["speed"] = 2
+                    entity["health_points"] = 2 if shooter else 1
+                elif entity_type == "obstacle" and not shooter:
+                    entity["movement_pattern"] = "falling_down"
+                    entity["speed"] = 3 + number % 3
+                entities.append(entity)
+
+        counts = ", ".join(f"{sum(1 for e in entities if e['type'] == t)} {t}" for t in requested)
+        rules = (
+            ["Shoot the enemies.", "Use the arrow keys to move and Space to shoot."]
+            if shooter else
+            ["Avoid the falling obstacles.", "Use the arrow keys to move left and right."]
+        )
+        return {
+            "game_title": f"{'Shooter' if shooter else 'Dodger'} ({counts})",
+            "screen_dimensions": {"width": TEMPLATE_SCREEN_WIDTH, "height": TEMPLATE_SCREEN_HEIGHT},
+            "background_color": TEMPLATE_BACKGROUND_COLOR,
+            "entities": entities,
+            "game_rules": rules
+        }
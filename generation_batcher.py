@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import jsonschema
+
+from game_schema_validator import validate_game_schema
+
+DEFAULT_BATCH_WINDOW_MS = 50
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_MAX_ATTEMPTS = 2
+
+
+class PromptBatcher:
+    """
+    Collects prompts submitted within a short window and generates them with one
+    backend.generate_batch() call, so a model backend sends the shared schema
+    definition once per batch instead of once per prompt.
+
+    Each schema is validated on its own. A prompt whose schema is missing or invalid
+    is re-queued and retried individually (backend.generate), up to max_attempts in
+    total; after that its future resolves to None.
+    """
+
+    def __init__(self, backend, window_ms=DEFAULT_BATCH_WINDOW_MS, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, validate=validate_game_schema):
+        self.backend = backend
+        self.window_s = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_attempts = max_attempts
+        self.validate = validate
+        self.stats = {"prompts": 0, "batches": 0, "backend_calls": 0, "retries": 0, "failed": 0}
+        self._queue = queue.SimpleQueue() # (prompt, future, attempts) entries, None to stop
+        self._pending = set()
+        self._thread = threading.Thread(target=self._run, name="prompt-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_prompt_text):
+        """Queues a prompt. Returns a Future resolving to its validated schema dict, or None."""
+        future = Future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        self.stats["prompts"] += 1
+        self._queue.put((user_prompt_text, future, 0))
+        return future
+
+    def generate(self, user_prompt_text):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(user_prompt_text).result()
+
+    def _collect(self, first):
+        """Gathers further entries until the window closes or the batch is full. Returns (batch, stop)."""
+        batch = [first]
+        deadline = time.monotonic() + self.window_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _is_valid(self, schema):
+        if schema is None:
+            return False
+        try:
+            self.validate(schema)
+            return True
+        except jsonschema.exceptions.ValidationError:
+            return False
+
+    def _finish(self, entry, schema):
+        user_prompt_text, future, attempts = entry
+        if self._is_valid(schema):
+            future.set_result(schema)
+        elif attempts + 1 < self.max_attempts:
+            self.stats["retries"] += 1
+            self._queue.put((user_prompt_text, future, attempts + 1)) # Retried on its own, not in a batch
+        else:
+            self.stats["failed"] += 1
+            future.set_result(None)
+
+    def _call(self, method, argument, count):
+        self.stats["backend_calls"] += 1
+        try:
+            return getattr(self.backend, method)(argument)
+        except Exception as e:
+            print(f"Warning: Batch generation with '{self.backend.name}' failed: {e}")
+            return None if count is None else [None] * count
+
+    def _run(self):
+        stop = False
+        while not stop:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            batch, stop = self._collect(entry)
+            fresh = [entry for entry in batch if entry[2] == 0]
+            retries = [entry for entry in batch if entry[2] > 0]
+            if fresh:
+                self.stats["batches"] += 1
+                schemas = list(self._call("generate_batch", [entry[0] for entry in fresh], len(fresh)) or [])
+                if len(schemas) != len(fresh):
+                    print(f"Warning: '{self.backend.name}' returned {len(schemas)} schemas for {len(fresh)} prompts. "
+                          "Prompts without a schema are retried individually.")
+                    schemas = (schemas + [None] * len(fresh))[:len(fresh)]
+                for fresh_entry, schema in zip(fresh, schemas):
+                    self._finish(fresh_entry, schema)
+            for retry_entry in retries:
+                self._finish(retry_entry, self._call("generate", retry_entry[0], None))
+        self._drain()
+
+    def _drain(self):
+        """After the stop marker: generates what is still queued (e.g. retries re-queued by the last batch)."""
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not None:
+                self._finish(entry, self._call("generate", entry[0], None))
+
+    def close(self):
+        """Waits until every submitted prompt has its result (including retries), then stops the thread."""
+        for future in list(self._pending):
+            future.result()
+        self._queue.put(None)
+        self._thread.join()
+
+
+if __name__ == '__main__':
+    class ShortBatchBackend:
+        """Returns a schema only for the first prompt of each batch."""
+        name = "short-batch"
+
+        def __init__(self, batch_schemas=True):
+            self.batch_schemas = batch_schemas
+
+        def generate(self, user_prompt_text):
+            return {"game_title": user_prompt_text}
+
+        def generate_batch(self, user_prompt_texts):
+            return [self.generate(user_prompt_texts[0])] if self.batch_schemas else [None] * len(user_prompt_texts)
+
+    accept_all = lambda schema: None
+    batcher = PromptBatcher(ShortBatchBackend(), window_ms=200, validate=accept_all)
+    futures = [batcher.submit(f"game {index}") for index in range(3)]
+    batcher.close()
+    assert [future.result() for future in futures] == [{"game_title": f"game {index}"} for index in range(3)]
+    assert batcher.stats["retries"] == 2, batcher.stats
+    print(f"Short batch result: every prompt resolved ({batcher.stats['retries']} individual retries).")
+
+    # Stop marker arrives inside the batch window: the retry re-queued by that batch must still run.
+    batcher = PromptBatcher(ShortBatchBackend(batch_schemas=False), window_ms=200, validate=accept_all)
+    future = batcher.submit("late game")
+    batcher._queue.put(None)
+    batcher._thread.join(timeout=5)
+    assert future.done() and future.result() == {"game_title": "late game"}, batcher.stats
+    print("Retry pending at shutdown: resolved before the thread stopped.")
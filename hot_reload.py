@@ -0,0 +1,259 @@
+import heapq
+import json
+import os
+
+import jsonschema
+
+from game_schema_validator import validate_game_schema, validate_entity
+from schema_complexity import BudgetExceededError, enforce_performance_budget
+from schema_compiler import compile_game_schema
+from simulation import create_entity_state, init_entity_state, init_projectile_state, DEFAULT_SIM_HZ
+
+DEFAULT_POLL_INTERVAL_S = 0.5
+
+
+class SchemaWatcher:
+    """
+    Polls a schema file's modification time and returns the parsed schema when it changes.
+    Polling is a single os.stat() per interval, cheap enough to call every frame.
+    """
+
+    def __init__(self, path, poll_interval_s=DEFAULT_POLL_INTERVAL_S):
+        self.path = path
+        self.poll_interval_s = poll_interval_s
+        self._last_mtime = self._mtime()
+        self._last_poll = 0.0
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self, now_s):
+        """Returns the new schema dict if the file changed since the last poll, otherwise None."""
+        if now_s - self._last_poll < self.poll_interval_s:
+            return None
+        self._last_poll = now_s
+        mtime = self._mtime()
+        if mtime is None or mtime == self._last_mtime:
+            return None
+        self._last_mtime = mtime
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            # Editors often write files in several steps; keep the running game and wait for the next save
+            print(f"[HOT RELOAD] Could not read {self.path}: {e}")
+            return None
+
+
+def diff_schemas(old_schema, new_schema):
+    """
+    Diffs two schemas by entity id. Returns a dict with the added, removed and changed
+    entity ids and whether anything outside "entities" (title, screen, rules, spawners) changed.
+    """
+    old_entities = {entity.get("id"): entity for entity in old_schema.get("entities", [])}
+    new_entities = {entity.get("id"): entity for entity in new_schema.get("entities", [])}
+    old_rest = {key: value for key, value in old_schema.items() if key != "entities"}
+    new_rest = {key: value for key, value in new_schema.items() if key != "entities"}
+    return {
+        "added": [entity_id for entity_id in new_entities if entity_id not in old_entities],
+        "removed": [entity_id for entity_id in old_entities if entity_id not in new_entities],
+        "changed": [
+            entity_id for entity_id, entity in new_entities.items()
+            if entity_id in old_entities and old_entities[entity_id] != entity
+        ],
+        "game_changed": old_rest != new_rest
+    }
+
+
+def validate_schema_update(old_schema, new_schema, diff):
+    """
+    Validates only what an edit touched: each added or changed entity against the entity
+    schema, and the top-level fields (with an empty entity list) if they changed.
+    Raises jsonschema.exceptions.ValidationError on the first problem.
+    """
+    new_entities = {entity.get("id"): entity for entity in new_schema.get("entities", [])}
+    for entity_id in diff["added"] + diff["changed"]:
+        validate_entity(new_entities[entity_id])
+    if diff["game_changed"]:
+        validate_game_schema(dict(new_schema, entities=[]))
+    if len(new_entities) != len(new_schema.get("entities", [])):
+        raise jsonschema.exceptions.ValidationError("Entity ids must be unique for hot reload.")
+
+
+def _patch_entity(entity, compiled_entity, old_data, new_data):
+    """
+    Applies a changed entity description in place. Runtime state (position, health,
+    shot timer, patrol direction) is kept, unless the edit changed that field itself.
+    """
+    state = {key: entity[key] for key in ("x", "y", "prev_x", "prev_y", "health_points", "last_shot_time", "patrol_direction")}
+    position_edited = old_data.get("position") != new_data.get("position")
+    if position_edited:
+        init_entity_state(entity, compiled_entity, compiled_entity.x, compiled_entity.y)
+    else:
+        init_entity_state(entity, compiled_entity, state["x"], state["y"])
+        entity["x"] = state["x"]
+        entity["y"] = state["y"]
+        entity["prev_x"] = state["prev_x"]
+        entity["prev_y"] = state["prev_y"]
+    if old_data.get("health_points") == new_data.get("health_points"):
+        entity["health_points"] = state["health_points"]
+    entity["last_shot_time"] = state["last_shot_time"]
+    if entity["movement_pattern"] == "moving_left_right_patrol" and state["patrol_direction"]:
+        entity["patrol_direction"] = state["patrol_direction"]
+
+
+def _rebuild_spawning(world, old_game, new_game):
+    """
+    Re-targets spawner bookkeeping at the new spawner list, matching spawners by id.
+    Live spawned entities, counters and pools carry over; the schedule restarts from
+    the current time, so waves that already happened are not replayed.
+    """
+    old_spawning = world["spawning"]
+    old_index_by_id = {spawner.id: index for index, spawner in enumerate(old_game.spawners)}
+    new_index_by_id = {spawner.id: index for index, spawner in enumerate(new_game.spawners)}
+    now = world["time_ms"]
+
+    queue = []
+    sequence = old_spawning["sequence"]
+    alive = [0] * len(new_game.spawners)
+    spawned = [0] * len(new_game.spawners)
+    pools = [[] for _ in new_game.spawners]
+    for index, spawner in enumerate(new_game.spawners):
+        old_index = old_index_by_id.get(spawner.id)
+        if old_index is not None:
+            spawned[index] = old_spawning["spawned"][old_index]
+            pools[index] = old_spawning["pools"][old_index]
+        if spawner.interval_ms:
+            queue.append((max(spawner.start_ms, now), sequence, index, None, spawner.interval_ms))
+            sequence += 1
+        for wave in spawner.waves:
+            if wave.at_ms >= now:
+                queue.append((wave.at_ms, sequence, index, wave.count, wave.spacing_ms))
+                sequence += 1
+    heapq.heapify(queue)
+
+    kept = []
+    for entity in world["entities"]:
+        if entity["spawner_index"] is None:
+            kept.append(entity)
+            continue
+        new_index = new_index_by_id.get(old_game.spawners[entity["spawner_index"]].id)
+        if new_index is not None: # Entities of deleted spawners leave with their spawner
+            entity["spawner_index"] = new_index
+            alive[new_index] += 1
+            kept.append(entity)
+    world["entities"] = kept
+    world["spawning"] = {"queue": queue, "sequence": sequence, "alive": alive, "spawned": spawned, "pools": pools}
+
+
+def _remap_projectile_archetypes(world, old_game, new_game):
+    """
+    Points in-flight projectiles and shooters at the new game's projectile archetypes,
+    matching them by owning entity id or spawner id. Projectiles keep their position,
+    velocity and expiry; everything else comes from the new archetype, as it would when
+    restored from a snapshot. Projectiles whose archetype no longer exists are dropped.
+    """
+    new_entities = {entity.id: entity for entity in new_game.entities}
+    new_spawners = {spawner.id: spawner for spawner in new_game.spawners}
+    archetype_map = {}
+    for entity in old_game.entities:
+        if entity.projectile_archetype is not None and entity.id in new_entities:
+            archetype_map[id(entity.projectile_archetype)] = new_entities[entity.id].projectile_archetype
+    for spawner in old_game.spawners:
+        if spawner.archetype.projectile_archetype is not None and spawner.id in new_spawners:
+            archetype_map[id(spawner.archetype.projectile_archetype)] = new_spawners[spawner.id].archetype.projectile_archetype
+
+    for entity in world["entities"]:
+        archetype = entity["projectile_archetype"]
+        if archetype is not None:
+            entity["projectile_archetype"] = archetype_map.get(id(archetype), archetype)
+
+    projectiles = []
+    for projectile in world["projectiles"]:
+        archetype = archetype_map.get(id(projectile["archetype"]))
+        if archetype is None:
+            continue # Its shooter was removed or can no longer shoot
+        if archetype is not projectile["archetype"]:
+            remapped = init_projectile_state(
+                archetype, projectile["number"], projectile["x"], projectile["y"], projectile["vx"], projectile["vy"],
+                projectile["owner_id"], projectile["team"], projectile["expires_at_ms"]
+            )
+            remapped["prev_x"] = projectile["prev_x"]
+            remapped["prev_y"] = projectile["prev_y"]
+            projectile = remapped
+        projectiles.append(projectile)
+    world["projectiles"] = projectiles
+
+
+def apply_schema_update(world, old_schema, new_schema, diff):
+    """
+    Patches a running world in place to match new_schema, given diff_schemas() output.
+    Schema entities are matched by id: removed ones leave the world, added ones are
+    created at their schema position, changed ones keep their runtime state.
+    Projectiles and spawned entities are left running, re-pointed at the new
+    projectile archetypes (see _remap_projectile_archetypes).
+    """
+    old_game = world["game"]
+    new_game = compile_game_schema(new_schema)
+    compiled_by_id = {compiled_entity.id: compiled_entity for compiled_entity in new_game.entities}
+    old_data_by_id = {entity.get("id"): entity for entity in old_schema.get("entities", [])}
+    new_data_by_id = {entity.get("id"): entity for entity in new_schema.get("entities", [])}
+    removed = set(diff["removed"])
+    changed = set(diff["changed"])
+
+    entities = []
+    for entity in world["entities"]:
+        if entity["spawner_index"] is None:
+            entity_id = entity["id"]
+            if entity_id in removed:
+                continue
+            if entity_id in changed:
+                _patch_entity(entity, compiled_by_id[entity_id], old_data_by_id[entity_id], new_data_by_id[entity_id])
+            else:
+                entity["spec"] = compiled_by_id[entity_id] # Same description, recompiled with the new game
+        entities.append(entity)
+    for entity_id in diff["added"]:
+        entities.append(create_entity_state(compiled_by_id[entity_id]))
+    world["entities"] = entities
+    world["game"] = new_game
+
+    player_id = new_game.entities[new_game.player_index].id if new_game.player_index is not None else None
+    world["player"] = next(
+        (entity for entity in entities if entity["spawner_index"] is None and entity["id"] == player_id),
+        None
+    )
+    if old_game.spawners != new_game.spawners:
+        _rebuild_spawning(world, old_game, new_game)
+    _remap_projectile_archetypes(world, old_game, new_game)
+    return new_game
+
+
+def reload_world(world, old_schema, new_schema, performance_budget=None, sim_hz=DEFAULT_SIM_HZ):
+    """
+    Validates and applies an edited schema to a running world. With a performance_budget
+    (see schema_complexity.py), edits that would exceed it are rejected too.
+    Returns the diff on success, or None if the edit was invalid (the world is left untouched).
+    """
+    diff = diff_schemas(old_schema, new_schema)
+    if not (diff["added"] or diff["removed"] or diff["changed"] or diff["game_changed"]):
+        return diff
+    try:
+        validate_schema_update(old_schema, new_schema, diff)
+    except jsonschema.exceptions.ValidationError as e:
+        print(f"[HOT RELOAD] Edit rejected, keeping the running game: {e.message}")
+        return None
+    if performance_budget is not None:
+        try:
+            enforce_performance_budget(new_schema, performance_budget, sim_hz)
+        except BudgetExceededError as e:
+            print(f"[HOT RELOAD] Edit rejected, keeping the running game: over the performance budget ({e})")
+            return None
+    apply_schema_update(world, old_schema, new_schema, diff)
+    print(
+        f"[HOT RELOAD] Applied: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+        f"{len(diff['changed'])} changed entities" + (", game settings updated." if diff["game_changed"] else ".")
+    )
+    return diff
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+
+import pygame
+
+# Text overlay (game rules and stats) for the live loop and the single-frame view.
+# font.render is one of the most expensive per-frame pygame calls, so nothing is
+# rendered per frame: the static rule lines are composed once into a single surface
+# (one blit per frame), and dynamic lines such as the player's health are rendered
+# once per distinct value and kept in an LRU cache.
+
+HUD_FONT_SIZE = 28
+HUD_TEXT_COLOR = (255, 255, 255)
+HUD_ORIGIN = (10, 10)
+HUD_LINE_HEIGHT = 25
+HUD_DYNAMIC_GAP = 5 # Extra space between the rules and the dynamic lines below them
+DEFAULT_TEXT_CACHE_SIZE = 64
+
+
+def load_hud_font(size=HUD_FONT_SIZE):
+    """Loads pygame's default font (pygame must be initialized). Returns None, with a warning, if it fails."""
+    try:
+        return pygame.font.Font(None, size)
+    except Exception as e:
+        print(f"Warning: Could not load default font. Game rules will not be displayed. Error: {e}")
+        return None
+
+
+class HudCompositor:
+    """
+    Draws game rules and dynamic text lines with cached surfaces.
+    Every method is a no-op without a font (e.g. when the default font failed to load).
+    With antialias=False, text surfaces use a colorkey instead of per-pixel alpha, which
+    is needed to draw onto 8-bit palettized surfaces (alpha text can't blend onto them).
+    """
+
+    def __init__(self, font, color=HUD_TEXT_COLOR, cache_size=DEFAULT_TEXT_CACHE_SIZE, antialias=True):
+        self.font = font
+        self.color = color
+        self.cache_size = cache_size
+        self.antialias = antialias
+        self._colorkey = (0, 0, 0) if tuple(color) != (0, 0, 0) else (255, 255, 255) # Transparent color of non-antialiased text
+        self._cache = OrderedDict() # text, or a tuple of rule lines -> surface (None if rendering failed)
+        self.stats = {"renders": 0, "hits": 0}
+
+    def _cached(self, key, build):
+        surface = self._cache.get(key, False)
+        if surface is not False:
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return surface
+        surface = build(key)
+        self.stats["renders"] += 1
+        self._cache[key] = surface
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False) # Least recently used
+        return surface
+
+    def _render(self, text):
+        try:
+            return self.font.render(text, self.antialias, self.color)
+        except Exception as e:
+            print(f"Warning: Could not render text: '{text}'. Error: {e}")
+            return None
+
+    def _prepare(self, surface):
+        """Converts to the display format and RLE-encodes, which speeds up blits of mostly transparent text."""
+        if not self.antialias:
+            surface.set_colorkey(surface.get_colorkey(), pygame.RLEACCEL)
+            return surface
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        surface.set_alpha(255, pygame.RLEACCEL)
+        return surface
+
+    def _compose_rules(self, rules):
+        lines = [self._render(rule_text) for rule_text in rules]
+        rendered = [line for line in lines if line is not None]
+        if not rendered:
+            return None
+        width = max(line.get_width() for line in rendered)
+        height = HUD_LINE_HEIGHT * (len(lines) - 1) + max(line.get_height() for line in rendered)
+        if self.antialias:
+            composed = pygame.Surface((width, height), pygame.SRCALPHA)
+        else:
+            composed = pygame.Surface((width, height))
+            composed.fill(self._colorkey)
+            composed.set_colorkey(self._colorkey)
+        for index, line in enumerate(lines):
+            if line is not None:
+                composed.blit(line, (0, index * HUD_LINE_HEIGHT))
+        return self._prepare(composed)
+
+    def _render_line(self, text):
+        line = self._render(text)
+        return self._prepare(line) if line is not None else None
+
+    def text_surface(self, text):
+        """Returns the cached surface for one line of text, rendering it on first use."""
+        if self.font is None:
+            return None
+        return self._cached(text, self._render_line)
+
+    def rules_surface(self, rules):
+        """Returns one surface with all rule lines stacked HUD_LINE_HEIGHT apart, composed on first use."""
+        if self.font is None or not rules:
+            return None
+        return self._cached(tuple(rules), self._compose_rules)
+
+    def draw(self, surface, rules, dynamic_lines=()):
+        """Draws the rules at HUD_ORIGIN and the dynamic lines below them."""
+        if self.font is None:
+            return
+        x, y = HUD_ORIGIN
+        rules_surface = self.rules_surface(rules)
+        if rules_surface is not None:
+            surface.blit(rules_surface, (x, y))
+        y += len(rules) * HUD_LINE_HEIGHT + HUD_DYNAMIC_GAP
+        for text in dynamic_lines:
+            text_surface = self.text_surface(text)
+            if text_surface is not None:
+                surface.blit(text_surface, (x, y))
+            y += HUD_LINE_HEIGHT
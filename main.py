@@ -1,5 +1,6 @@
 import json
 import argparse
+import copy
 import os
 import sys
 import google.generativeai as genai
@@ -11,7 +12,16 @@ sys.path.insert(0, project_root)
 
 try:
     from game_schema_validator import validate_game_schema, GAME_SCHEMA_DEFINITION
-    from renderer import render_game_from_schema
+    from renderer import render_game_from_schema, DEFAULT_TARGET_FPS
+    from simulation import DEFAULT_SIM_HZ
+    from schema_corpus import SchemaCorpus
+    from prompt_cache import PromptCache, DEFAULT_PROMPT_CACHE_PATH, DEFAULT_SIMILARITY_THRESHOLD
+    from generation_backends import CallableBackend, GeminiBackend, FallbackBackend, TemplateBackend
+    from generation_batcher import PromptBatcher, DEFAULT_BATCH_WINDOW_MS, DEFAULT_MAX_BATCH_SIZE
+    from schema_server import run_server, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_CONCURRENCY
+    from memory_monitor import MemoryMonitor
+    from schema_complexity import BudgetExceededError, enforce_performance_budget, format_complexity_report, load_performance_budget
+    from gameplay_capture import capture_gameplay, DEFAULT_CAPTURE_SECONDS, DEFAULT_CAPTURE_FPS, DEFAULT_CAPTURE_SCALE
 except ImportError as e:
     print(f"Error importing modules: {e}")
     print("Make sure you are running this script from the 'genesis_ai_game_weaver' directory or have it in your PYTHONPATH.")
@@ -21,24 +31,13 @@ except ImportError as e:
 GEMINI_API_KEY = None
 try:
     GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-    if not GEMINI_API_KEY:
-        print("Warning: GEMINI_API_KEY environment variable not set. Prompt generation will be skipped if requested.")
-    else:
+    if GEMINI_API_KEY: # A missing key is reported when a "gemini" backend is created
         genai.configure(api_key=GEMINI_API_KEY)
 except Exception as e:
     print(f"Error configuring Gemini API: {e}")
 
 
-def build_gemini_prompt(user_prompt_text, schema_definition_dict):
-    """Builds the prompt for Gemini to generate the game schema."""
-    schema_json_string = json.dumps(schema_definition_dict, indent=2)
-
-    prompt = f"""You are an expert game design assistant. Your task is to generate a game schema in JSON format based on a user's natural language prompt.
-The JSON output MUST strictly follow this structure and its type definitions:
-
-{schema_json_string}
-
-Key considerations for generation:
+GEMINI_GENERATION_GUIDELINES = """Key considerations for generation:
 - Ensure all required fields from the schema definition are present.
 - For colors, use an array of three integers (RGB, 0-255).
 - For entity types, choose from the allowed enum values.
@@ -48,7 +47,18 @@ Key considerations for generation:
 - Use "movement_pattern" and "speed" for entities that move automatically (e.g., "falling_down" for obstacles, "moving_left_right_patrol" for enemies).
 - "player_horizontal_control" is a special movement_pattern for player entities controlled left/right by the user.
 - "static" movement_pattern is for entities that don't move.
-- "game_rules" can be a list of simple text strings describing objectives or win/loss conditions (e.g., "Avoid falling obstacles.", "Collect all targets.").
+- "game_rules" can be a list of simple text strings describing objectives or win/loss conditions (e.g., "Avoid falling obstacles.", "Collect all targets.")."""
+
+def build_gemini_prompt(user_prompt_text, schema_definition_dict):
+    """Builds the prompt for Gemini to generate the game schema."""
+    schema_json_string = json.dumps(schema_definition_dict, indent=2)
+
+    prompt = f"""You are an expert game design assistant. Your task is to generate a game schema in JSON format based on a user's natural language prompt.
+The JSON output MUST strictly follow this structure and its type definitions:
+
+{schema_json_string}
+
+{GEMINI_GENERATION_GUIDELINES}
 
 User prompt: "{user_prompt_text}"
 
@@ -56,6 +66,28 @@ Generated JSON game schema (provide only the JSON object, no extra text or markd
 """
     return prompt
 
+def build_gemini_batch_prompt(user_prompt_texts, schema_definition_dict):
+    """
+    Builds one Gemini prompt that asks for a schema per user prompt, as a JSON array in
+    the same order. The schema definition and guidelines are sent once for the whole batch.
+    """
+    schema_json_string = json.dumps(schema_definition_dict, indent=2)
+    numbered_prompts = "\n".join(f'{number}. "{text}"' for number, text in enumerate(user_prompt_texts, start=1))
+
+    prompt = f"""You are an expert game design assistant. Your task is to generate one game schema in JSON format for each of several natural language prompts.
+Every game schema MUST strictly follow this structure and its type definitions:
+
+{schema_json_string}
+
+{GEMINI_GENERATION_GUIDELINES}
+
+User prompts:
+{numbered_prompts}
+
+Generated JSON array with exactly {len(user_prompt_texts)} game schemas, one per user prompt and in the same order (provide only the JSON array, no extra text or markdown formatting like ```json):
+"""
+    return prompt
+
 def generate_schema_from_prompt(gemini_full_prompt: str) -> dict | None:
     """
     Simulates a call to Gemini API to generate a game schema.
@@ -135,6 +167,76 @@ def generate_schema_from_prompt(gemini_full_prompt: str) -> dict | None:
             "game_rules": ["A default game."]
         }
 
+GENERATION_BACKENDS = ("simulated", "template", "gemini")
+
+def create_generation_backend(name):
+    """
+    Creates a schema generation backend by name:
+    "simulated" - the keyword-based Gemini simulation above (default),
+    "template"  - the offline template generator (generation_backends.TemplateBackend),
+    "gemini"    - the Gemini API, falling back to the template generator if a call fails.
+    """
+    if name == "template":
+        return TemplateBackend()
+    if name == "gemini":
+        if not GEMINI_API_KEY:
+            print("Warning: GEMINI_API_KEY is not set. Using the local template backend instead.")
+            return TemplateBackend()
+        return FallbackBackend(
+            GeminiBackend(
+                lambda text: build_gemini_prompt(text, GAME_SCHEMA_DEFINITION),
+                build_batch_prompt=lambda texts: build_gemini_batch_prompt(texts, GAME_SCHEMA_DEFINITION)
+            ),
+            TemplateBackend()
+        )
+    return CallableBackend(
+        "simulated",
+        lambda text: generate_schema_from_prompt(build_gemini_prompt(text, GAME_SCHEMA_DEFINITION)), # Simulates Gemini call
+        generate_corrected_schema_from_prompt
+    )
+
+def generate_schema_for_idea(user_prompt_text, prompt_cache=None, backend=None):
+    """
+    Returns a schema for a game idea from the given generation backend (the simulation
+    by default). If prompt_cache holds a schema generated for a near-identical earlier
+    prompt, that schema is reused instead of generating a new one.
+    """
+    if prompt_cache is not None:
+        cached = prompt_cache.lookup(user_prompt_text)
+        if cached is not None:
+            schema, similarity, cached_prompt = cached
+            print(f"[PROMPT CACHE] Reusing the schema generated for \"{cached_prompt}\" (similarity {similarity:.2f}).")
+            return copy.deepcopy(schema)
+    backend = backend or create_generation_backend("simulated")
+    return backend.generate(user_prompt_text)
+
+def generate_schemas_for_prompts(user_prompt_texts, backend, output_dir, window_ms=DEFAULT_BATCH_WINDOW_MS, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+    """
+    Generates a schema for each prompt through a PromptBatcher (several prompts per
+    backend call) and saves the valid ones to output_dir as game_<n>.json.
+    Returns the number of prompts that produced a valid schema.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    batcher = PromptBatcher(backend, window_ms=window_ms, max_batch_size=max_batch_size)
+    futures = [batcher.submit(user_prompt_text) for user_prompt_text in user_prompt_texts]
+    succeeded = 0
+    for number, (user_prompt_text, future) in enumerate(zip(user_prompt_texts, futures), start=1):
+        schema = future.result()
+        if schema is None:
+            print(f"Error: No valid schema for prompt {number}: \"{user_prompt_text}\"")
+            continue
+        output_path = os.path.join(output_dir, f"game_{number}.json")
+        with open(output_path, 'w') as f:
+            json.dump(schema, f, indent=4)
+        succeeded += 1
+    batcher.close()
+    stats = batcher.stats
+    print(
+        f"Generated {succeeded}/{len(user_prompt_texts)} schemas in {output_dir} with {stats['backend_calls']} "
+        f"backend calls ({stats['batches']} batches, {stats['retries']} individual retries)."
+    )
+    return succeeded
+
 def build_gemini_correction_prompt(original_user_query: str, faulty_schema_json: str, error_message: str, game_schema_definition_json: str) -> str:
     """Builds a prompt for Gemini to correct a faulty game schema based on an error."""
     return f"""The user originally asked for: '{original_user_query}'.
@@ -240,6 +342,21 @@ def load_game_from_json_file(file_path):
         return None
 
 
+def load_game_from_corpus(corpus_path, game_index):
+    """Loads one game's schema from a packed corpus file (see schema_corpus.py)."""
+    try:
+        with SchemaCorpus(corpus_path) as corpus:
+            game_data = corpus.load_schema(game_index)
+        print(f"Successfully loaded game {game_index} from corpus {corpus_path}")
+        return game_data
+    except FileNotFoundError:
+        print(f"Error: Corpus file not found at {corpus_path}")
+        return None
+    except (ValueError, IndexError) as e:
+        print(f"Error: Could not read game {game_index} from corpus {corpus_path}: {e}")
+        return None
+
+
 def get_game_idea_from_user() -> str:
     """Prompts the user for their game idea and returns the input."""
     while True:
@@ -254,6 +371,9 @@ def main():
     group = parser.add_mutually_exclusive_group()
     group.add_argument("--json_file", help="Path to the game schema JSON file.")
     group.add_argument("--prompt", help="Natural language prompt to generate the game schema.")
+    group.add_argument("--corpus", help="Path to a packed schema corpus file (see schema_corpus.py).")
+    group.add_argument("--serve", action="store_true", help="Run the local HTTP service (/generate, /validate, /render) instead of a single game.")
+    group.add_argument("--batch_prompts", help="Text file with one prompt per line: generate all schemas in batches, save them and exit.")
     # parser.add_argument("--run_live", action="store_true", help="Run the game in a live loop instead of saving a single frame.") # Removed duplicate
 
     parser.add_argument(
@@ -271,13 +391,144 @@ def main():
         action="store_true",
         help="Run the game with a live Pygame window instead of just saving a frame."
     )
+    parser.add_argument(
+        "--corpus_index",
+        type=int,
+        default=0,
+        help="With --corpus: index of the game to load from the corpus."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=GENERATION_BACKENDS,
+        default="simulated",
+        help="Schema generator for prompts: the Gemini simulation, the offline template generator, or the Gemini API."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="With --serve: address to listen on.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="With --serve: port to listen on.")
+    parser.add_argument(
+        "--max_concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="With --serve: maximum number of requests processed at once."
+    )
+    parser.add_argument(
+        "--output_dir",
+        default="generated_games",
+        help="With --batch_prompts: directory for the generated schema files."
+    )
+    parser.add_argument(
+        "--batch_window_ms",
+        type=int,
+        default=DEFAULT_BATCH_WINDOW_MS,
+        help="With --batch_prompts: how long to collect prompts before sending a batch."
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=DEFAULT_MAX_BATCH_SIZE,
+        help="With --batch_prompts: maximum number of prompts per backend call."
+    )
+    parser.add_argument(
+        "--prompt_cache",
+        nargs="?",
+        const=DEFAULT_PROMPT_CACHE_PATH,
+        metavar="PATH",
+        help=f"Reuse the schemas of earlier near-duplicate prompts, kept in PATH (default {DEFAULT_PROMPT_CACHE_PATH}). Off unless given."
+    )
+    parser.add_argument(
+        "--similarity",
+        type=float,
+        default=DEFAULT_SIMILARITY_THRESHOLD,
+        help="Minimum prompt similarity (0-1) for reusing a cached schema."
+    )
+    parser.add_argument(
+        "--memory_profile",
+        type=int,
+        metavar="N",
+        help="With --run_live: sample memory (tracemalloc), live entities and spawner pools every N frames and print a growth report on exit."
+    )
+    parser.add_argument(
+        "--performance_budget",
+        help="JSON file overriding the performance budget limits (see schema_complexity.py)."
+    )
+    parser.add_argument(
+        "--budget_mode",
+        choices=("reject", "warn", "off"),
+        default="reject",
+        help="What to do with a schema whose estimated worst-case cost exceeds the performance budget. "
+             "In reject mode, over-budget hot-reload edits and /render requests are refused as well."
+    )
+    parser.add_argument(
+        "--capture",
+        metavar="PATH",
+        help="Instead of rendering, record a headless preview clip with scripted input: an animated GIF if PATH ends in .gif, otherwise a directory of PNG frames."
+    )
+    parser.add_argument("--capture_seconds", type=float, default=DEFAULT_CAPTURE_SECONDS, help="With --capture: seconds of gameplay to record.")
+    parser.add_argument("--capture_fps", type=int, default=DEFAULT_CAPTURE_FPS, help="With --capture: frames per second of the clip.")
+    parser.add_argument("--capture_scale", type=float, default=DEFAULT_CAPTURE_SCALE, help="With --capture: frame size relative to the game screen (e.g. 0.5).")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="With --json_file and --run_live: apply edits to the schema file to the running game without restarting."
+    )
+    parser.add_argument(
+        "--fps",
+        type=int,
+        default=DEFAULT_TARGET_FPS,
+        help="Target render frame rate for --run_live (e.g. 60, 144). Use 0 for uncapped."
+    )
+    parser.add_argument(
+        "--sim_hz",
+        type=int,
+        default=DEFAULT_SIM_HZ,
+        help="Fixed simulation tick rate for --run_live, independent of the render frame rate."
+    )
 
     args = parser.parse_args()
+    if args.sim_hz <= 0:
+        parser.error("--sim_hz must be a positive number of ticks per second.")
+    if args.max_concurrency < 1:
+        parser.error("--max_concurrency must be at least 1.")
+    for option in ("capture_seconds", "capture_fps", "capture_scale"):
+        if getattr(args, option) <= 0:
+            parser.error(f"--{option} must be positive.")
 
     game_data = None
     schema_source_type = None  # To track 'file', 'prompt_arg', or 'user_input'
     original_user_prompt_text = None # Store the original text from user/arg for potential re-prompting
 
+    backend = None # Created only by the paths that generate or correct schemas
+
+    if args.batch_prompts:
+        try:
+            with open(args.batch_prompts, 'r') as f:
+                user_prompt_texts = [line.strip() for line in f if line.strip()]
+        except OSError as e:
+            print(f"Error: Could not read prompts file {args.batch_prompts}: {e}")
+            return 1
+        output_dir = args.output_dir if os.path.isabs(args.output_dir) else os.path.join(project_root, args.output_dir)
+        backend = create_generation_backend(args.backend)
+        generate_schemas_for_prompts(user_prompt_texts, backend, output_dir, args.batch_window_ms, args.batch_size)
+        return 0
+
+    performance_budget = None
+    if args.budget_mode != "off":
+        try:
+            performance_budget = load_performance_budget(args.performance_budget) if args.performance_budget else {}
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not read performance budget {args.performance_budget}: {e}")
+            return 1
+    enforced_budget = performance_budget if args.budget_mode == "reject" else None # For /render and hot reload
+
+    prompt_cache = None
+    if args.prompt_cache and not args.json_file and not args.corpus:
+        prompt_cache = PromptCache(args.prompt_cache, threshold=args.similarity)
+
+    if args.serve:
+        backend = create_generation_backend(args.backend)
+        run_server(backend, args.host, args.port, args.max_concurrency, prompt_cache, enforced_budget)
+        return 0
+
     # Construct absolute path for output_json (used if schema is generated)
     if not os.path.isabs(args.output_json):
         output_json_abs_path = os.path.join(project_root, args.output_json)
@@ -298,14 +549,20 @@ def main():
             print(f"Error: Could not load game from JSON file: {json_file_abs_path}. Exiting.")
             return 1
 
+    elif args.corpus:
+        corpus_abs_path = args.corpus if os.path.isabs(args.corpus) else os.path.join(project_root, args.corpus)
+        game_data = load_game_from_corpus(corpus_abs_path, args.corpus_index)
+        schema_source_type = "corpus"
+        if game_data is None:
+            print(f"Error: Could not load game from corpus: {corpus_abs_path}. Exiting.")
+            return 1
+
     elif args.prompt:
         original_user_prompt_text = args.prompt
         print(f"Using prompt from argument: \"{original_user_prompt_text}\"")
         
-        gemini_full_prompt = build_gemini_prompt(original_user_prompt_text, GAME_SCHEMA_DEFINITION)
-        # print(f"\n--- Gemini Prompt (from arg) ---\n{gemini_full_prompt}\n--- End of Gemini Prompt ---\n")
-        
-        game_data = generate_schema_from_prompt(gemini_full_prompt) # Simulates Gemini call
+        backend = create_generation_backend(args.backend)
+        game_data = generate_schema_for_idea(original_user_prompt_text, prompt_cache, backend)
         schema_source_type = "prompt_arg"
         if game_data is None:
             print("Error: Gemini simulation failed to generate schema from prompt argument. Exiting.")
@@ -323,10 +580,8 @@ def main():
         original_user_prompt_text = get_game_idea_from_user()
         print(f"Processing your idea: \"{original_user_prompt_text}\"")
 
-        gemini_full_prompt = build_gemini_prompt(original_user_prompt_text, GAME_SCHEMA_DEFINITION)
-        # print(f"\n--- Gemini Prompt (from user input) ---\n{gemini_full_prompt}\n--- End of Gemini Prompt ---\n")
-
-        game_data = generate_schema_from_prompt(gemini_full_prompt) # Simulates Gemini call
+        backend = create_generation_backend(args.backend)
+        game_data = generate_schema_for_idea(original_user_prompt_text, prompt_cache, backend)
         schema_source_type = "user_input"
         if game_data is None:
             print("Error: Gemini simulation failed to generate schema from user input. Exiting.")
@@ -363,7 +618,8 @@ def main():
             print(f"Schema validation failed (Attempt {attempts + 1} of {MAX_CORRECTION_ATTEMPTS + 1}): {e.message}")
             attempts += 1
             if attempts <= MAX_CORRECTION_ATTEMPTS:
-                print("Attempting to correct schema with Gemini (Simulated)...")
+                backend = backend or create_generation_backend(args.backend) # Schemas loaded from a file or corpus
+                print(f"Attempting to correct schema with the '{backend.name}' backend...")
                 correction_prompt_for_gemini = None
                 if schema_source_type == "file":
                     file_path_for_message = json_file_abs_path if 'json_file_abs_path' in locals() else args.json_file
@@ -384,7 +640,7 @@ def main():
 
                 if correction_prompt_for_gemini:
                     print(f"[SIMULATION] Using correction prompt for Gemini: '{correction_prompt_for_gemini[:150]}...'" )
-                    corrected_data = generate_corrected_schema_from_prompt(correction_prompt_for_gemini)
+                    corrected_data = backend.correct(correction_prompt_for_gemini, original_prompt_for_correction)
                     print(f"[DEBUG] In main, corrected_data is None: {corrected_data is None}")
                     if corrected_data:
                         current_game_data = corrected_data # Update current_game_data for next validation attempt
@@ -423,6 +679,40 @@ def main():
         print("Could not obtain a valid game schema after attempts. Exiting.")
         return
 
+    if performance_budget is not None:
+        try:
+            print(format_complexity_report(enforce_performance_budget(game_data, performance_budget, args.sim_hz)))
+        except BudgetExceededError as e:
+            print(format_complexity_report(e.report))
+            for violation in e.violations:
+                print(f"Performance budget exceeded: {violation}")
+            if args.budget_mode == "reject":
+                print("The game would be too expensive to run. Exiting (use --budget_mode warn to run it anyway).")
+                return 1
+
+    if prompt_cache is not None and original_user_prompt_text:
+        prompt_cache.add(original_user_prompt_text, game_data)
+        try:
+            prompt_cache.save()
+        except OSError as e:
+            print(f"Warning: Could not save prompt cache to {prompt_cache.path}: {e}")
+
+    if args.capture:
+        print(f"Recording {args.capture_seconds} s of gameplay to {args.capture}...")
+        try:
+            stats = capture_gameplay(
+                game_data, args.capture, seconds=args.capture_seconds, fps=args.capture_fps,
+                scale=args.capture_scale, sim_hz=args.sim_hz
+            )
+        except Exception as e:
+            print(f"An error occurred during gameplay capture: {e}")
+            return 1
+        print(
+            f"Wrote {stats['frames']} frames ({stats['size'][0]}x{stats['size'][1]}) to {stats['output']} "
+            f"in {stats['wall_s']:.1f} s ({stats['encoder_wait_s']:.1f} s waiting for the encoder)."
+        )
+        return 0
+
     # Construct absolute path for output_image
     if not os.path.isabs(args.output_image):
         output_image_abs_path = os.path.join(project_root, args.output_image)
@@ -438,7 +728,12 @@ def main():
         render_game_from_schema(
             game_data,
             output_image_path=output_image_abs_path,
-            run_loop=args.run_live
+            run_loop=args.run_live,
+            target_fps=args.fps,
+            sim_hz=args.sim_hz,
+            watch_path=json_file_abs_path if args.watch and schema_source_type == "file" and attempts == 0 else None,
+            memory_monitor=MemoryMonitor(args.memory_profile) if args.memory_profile and args.run_live else None,
+            performance_budget=enforced_budget
         )
         if not args.run_live:
             print(f"Game frame should be saved to {output_image_abs_path}")
@@ -0,0 +1,253 @@
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import re
+import time
+import tracemalloc
+
+from game_schema_validator import find_schema_error
+from schema_compiler import compile_game_schema
+from simulation import create_world, step_world, scripted_controls, DEFAULT_SIM_HZ
+
+# Opt-in memory instrumentation for long-running sessions. Every N frames (or ticks)
+# a sample records the traced Python heap (tracemalloc), live entities and projectiles
+# by type, spawner pool occupancy and how many projectiles have outlived a whole sample
+# interval. report() summarizes growth over the session and lists leak suspects:
+# quantities that kept growing over the last LEAK_TREND_SAMPLES samples.
+
+DEFAULT_SAMPLE_EVERY_FRAMES = 600 # About 10 s of a 60 FPS live session
+DEFAULT_SOAK_TICKS = 1000000
+DEFAULT_TRACEBACK_FRAMES = 1
+DEFAULT_TOP_ALLOCATIONS = 10
+LEAK_TREND_SAMPLES = 4 # Growth in each of this many consecutive samples marks a suspect
+LEAK_MIN_GROWTH_BYTES = 64 * 1024 # Heap growth below this over the trend window is noise
+MAX_REPORT_ROWS = 20 # Longer sessions show evenly spaced samples
+
+
+class MemoryMonitor:
+    """
+    Samples memory and world occupancy while a world is stepped.
+    Call start() once, maybe_sample(world) every frame (or tick), then report().
+    With trace=False only the world counts are sampled, which costs almost nothing.
+    """
+
+    def __init__(self, sample_every=DEFAULT_SAMPLE_EVERY_FRAMES, trace=True,
+                 traceback_frames=DEFAULT_TRACEBACK_FRAMES, top_allocations=DEFAULT_TOP_ALLOCATIONS):
+        self.sample_every = max(1, sample_every)
+        self.trace = trace
+        self.traceback_frames = traceback_frames
+        self.top_allocations = top_allocations
+        self.samples = []
+        self._frames = 0
+        self._started_tracing = False
+        self._baseline = None # tracemalloc snapshot at the first sample
+        self._latest = None
+        self._previous_projectiles = set()
+        self._start_wall = None
+
+    def start(self):
+        self._start_wall = time.perf_counter()
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def maybe_sample(self, world):
+        """Counts one frame and takes a sample every sample_every frames."""
+        self._frames += 1
+        if self._frames % self.sample_every == 0:
+            self.sample(world)
+
+    def _snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        # Leave out the monitor itself, and the pattern caches its own filtering fills
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, fnmatch.__file__),
+            tracemalloc.Filter(False, os.path.join(os.path.dirname(re.__file__), "*"))
+        ))
+
+    def sample(self, world):
+        """Records one sample of the world and, when tracing, of the traced heap."""
+        gc.collect() # Count only memory that is still reachable
+        by_type = {}
+        for entity in world["entities"]:
+            by_type[entity["type"]] = by_type.get(entity["type"], 0) + 1
+        projectile_numbers = set()
+        for projectile in world["projectiles"]:
+            by_type[projectile["type"]] = by_type.get(projectile["type"], 0) + 1
+            projectile_numbers.add(projectile["number"])
+        # Projectile numbers are never reused, so one seen in the previous sample has
+        # survived a whole interval; normally they expire or leave the screen long before.
+        long_lived = len(projectile_numbers & self._previous_projectiles)
+        self._previous_projectiles = projectile_numbers
+
+        spawning = world["spawning"]
+        sample = {
+            "frame": self._frames,
+            "tick": world["tick"],
+            "time_ms": world["time_ms"],
+            "wall_s": time.perf_counter() - self._start_wall if self._start_wall is not None else 0.0,
+            "entities": len(world["entities"]),
+            "projectiles": len(world["projectiles"]),
+            "long_lived_projectiles": long_lived,
+            "by_type": by_type,
+            "pools": [
+                {
+                    "spawner": spawner.id,
+                    "alive": spawning["alive"][index],
+                    "pooled": len(spawning["pools"][index]),
+                    "spawned": spawning["spawned"][index]
+                }
+                for index, spawner in enumerate(world["game"].spawners)
+            ],
+            "traced_bytes": None,
+            "traced_peak_bytes": None
+        }
+        if tracemalloc.is_tracing():
+            if self._latest is not self._baseline:
+                self._latest = None # Don't hold two snapshots while taking the next one
+            self._latest = self._snapshot()
+            # Summed from the filtered snapshot, so the monitor's own samples and snapshots don't read as growth
+            sample["traced_bytes"] = sum(stat.size for stat in self._latest.statistics("filename"))
+            sample["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            if self._baseline is None:
+                self._baseline = self._latest
+        self.samples.append(sample)
+        return sample
+
+    def top_growth(self):
+        """Allocation sites that grew most since the first sample, as (location, size_diff, count_diff)."""
+        if self._baseline is None or self._latest is None or self._latest is self._baseline:
+            return []
+        growth = []
+        for stat in self._latest.compare_to(self._baseline, "lineno")[:self.top_allocations]:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            growth.append((f"{frame.filename}:{frame.lineno}", stat.size_diff, stat.count_diff))
+        return growth
+
+    def leak_suspects(self):
+        """Names of quantities that grew in each of the last LEAK_TREND_SAMPLES samples."""
+        window = self.samples[-(LEAK_TREND_SAMPLES + 1):]
+        if len(window) <= LEAK_TREND_SAMPLES:
+            return []
+
+        def rising(values):
+            return all(later > earlier for earlier, later in zip(values, values[1:]))
+
+        suspects = []
+        traced = [sample["traced_bytes"] for sample in window]
+        if None not in traced and rising(traced) and traced[-1] - traced[0] >= LEAK_MIN_GROWTH_BYTES:
+            suspects.append(f"traced heap (+{(traced[-1] - traced[0]) / 1024:.1f} KB over the last {LEAK_TREND_SAMPLES} samples)")
+        types = sorted({entity_type for sample in window for entity_type in sample["by_type"]})
+        for entity_type in types:
+            counts = [sample["by_type"].get(entity_type, 0) for sample in window]
+            if rising(counts):
+                suspects.append(f"live '{entity_type}' count ({counts[0]} -> {counts[-1]})")
+        long_lived = [sample["long_lived_projectiles"] for sample in window]
+        if rising(long_lived):
+            suspects.append(f"projectiles that never leave the world ({long_lived[-1]} alive for more than {self.sample_every} frames)")
+        return suspects
+
+    def report(self):
+        """Human-readable growth report over all samples."""
+        if not self.samples:
+            return "Memory report: no samples taken."
+        first = self.samples[0]
+        last = self.samples[-1]
+        lines = [
+            f"Memory report: {len(self.samples)} samples over {last['tick']} ticks "
+            f"({last['time_ms'] / 3600000.0:.2f} h simulated, {last['wall_s']:.1f} s wall)",
+            f"  {'tick':>10} {'traced KB':>10} {'entities':>9} {'projectiles':>12} {'long-lived':>11}  pools (alive/pooled)"
+        ]
+        step = max(1, -(-len(self.samples) // MAX_REPORT_ROWS))
+        rows = self.samples[::step]
+        if rows[-1] is not last:
+            rows.append(last)
+        for sample in rows:
+            traced = f"{sample['traced_bytes'] / 1024:.1f}" if sample["traced_bytes"] is not None else "-"
+            pools = ", ".join(f"{pool['spawner']} {pool['alive']}/{pool['pooled']}" for pool in sample["pools"]) or "-"
+            lines.append(
+                f"  {sample['tick']:>10} {traced:>10} {sample['entities']:>9} {sample['projectiles']:>12} "
+                f"{sample['long_lived_projectiles']:>11}  {pools}"
+            )
+
+        growth = [
+            f"entities {last['entities'] - first['entities']:+d}",
+            f"projectiles {last['projectiles'] - first['projectiles']:+d}"
+        ]
+        if first["traced_bytes"] is not None and last["traced_bytes"] is not None:
+            growth.insert(0, f"traced heap {(last['traced_bytes'] - first['traced_bytes']) / 1024:+.1f} KB")
+            growth.append(f"peak {last['traced_peak_bytes'] / 1024:.1f} KB")
+        lines.append("Growth since the first sample: " + ", ".join(growth))
+
+        top_growth = self.top_growth()
+        if top_growth:
+            lines.append("Top allocation growth:")
+            for location, size_diff, count_diff in top_growth:
+                lines.append(f"  {location}: {size_diff / 1024:+.1f} KB ({count_diff:+d} blocks)")
+        suspects = self.leak_suspects()
+        lines.append("Leak suspects: " + ("; ".join(suspects) if suspects else "none"))
+        return "\n".join(lines)
+
+
+def run_soak_test(game_schema, ticks=DEFAULT_SOAK_TICKS, sample_every=None, sim_hz=DEFAULT_SIM_HZ, seed=0, trace=True, progress=True):
+    """
+    Steps a validated schema headlessly for ticks fixed steps with scripted input
+    (no rendering, no display) and returns the MemoryMonitor holding the samples.
+    sample_every (in ticks) defaults to 20 samples over the run.
+    """
+    game = compile_game_schema(game_schema)
+    world = create_world(game, seed)
+    monitor = MemoryMonitor(sample_every or max(1, ticks // 20), trace=trace)
+    controls_at = scripted_controls(sim_hz)
+    dt = 1.0 / sim_hz
+    monitor.start()
+    try:
+        for tick in range(ticks):
+            step_world(world, dt, controls_at(tick))
+            sample_count = len(monitor.samples)
+            monitor.maybe_sample(world)
+            if progress and len(monitor.samples) > sample_count:
+                sample = monitor.samples[-1]
+                print(f"[SOAK] tick {sample['tick']}: {sample['entities']} entities, {sample['projectiles']} projectiles")
+    finally:
+        monitor.stop()
+    return monitor
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless soak test: run a game schema for many ticks and report memory growth.")
+    parser.add_argument("json_file")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_SOAK_TICKS)
+    parser.add_argument("--sample_every", type=int, help="Ticks between samples (default: 20 samples per run).")
+    parser.add_argument("--sim_hz", type=int, default=DEFAULT_SIM_HZ)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no_tracemalloc", action="store_true", help="Only sample world counts (much faster).")
+    parser.add_argument("--json_report", help="Also write all samples to this JSON file.")
+    args = parser.parse_args()
+    if args.sim_hz <= 0:
+        parser.error("--sim_hz must be a positive number of ticks per second.")
+
+    with open(args.json_file, 'r') as f:
+        game_schema = json.load(f)
+    error = find_schema_error(game_schema)
+    if error is not None:
+        print(f"Error: {args.json_file} is not a valid schema: {error.message}")
+        raise SystemExit(2)
+
+    monitor = run_soak_test(game_schema, args.ticks, args.sample_every, args.sim_hz, args.seed, trace=not args.no_tracemalloc)
+    print(monitor.report())
+    if args.json_report:
+        with open(args.json_report, 'w') as f:
+            json.dump(monitor.samples, f, indent=2)
+    raise SystemExit(1 if monitor.leak_suspects() else 0)
@@ -0,0 +1,173 @@
+import json
+import math
+import os
+import re
+
+from generation_backends import number_word_value, prompt_key
+
+# Reuses schemas generated for earlier prompts when a new prompt is a near-duplicate.
+#
+# Prompts are compared as TF-IDF weighted character n-gram vectors (cosine similarity),
+# which is robust to reordered words, plurals and small typos. Similar wording is not
+# enough, though: "5 red aliens" and "50 blue aliens" score high but need different
+# schemas. So only prompts with the same prompt_key() (extracted features, numbers,
+# colors and negations) are compared at all. Lookups are approximate:
+# instead of scoring every cached prompt, only prompts sharing one of the query's
+# rarest n-grams (an inverted index probe) are scored, so lookup cost depends on the
+# few postings probed rather than on the cache size.
+
+DEFAULT_PROMPT_CACHE_PATH = "prompt_cache.json"
+DEFAULT_SIMILARITY_THRESHOLD = 0.8 # Paraphrases usually score 0.7-0.85; a wrong reuse costs more than a regeneration
+DEFAULT_NGRAM_SIZE = 3
+DEFAULT_PROBE_TERMS = 12
+
+
+def normalize_prompt(prompt):
+    """
+    Lowercases, collapses punctuation and whitespace, drops articles and spells counts
+    as digits ("five" -> "5"), so formatting does not affect similarity.
+    """
+    words = [word for word in re.findall(r"[a-z]+|[0-9]+", prompt.lower()) if word not in ("a", "an", "the")]
+    return " ".join(str(number_word_value(word)) if number_word_value(word) is not None else word for word in words)
+
+
+def prompt_ngrams(prompt, size=DEFAULT_NGRAM_SIZE):
+    """Returns {n-gram: count} for the normalized prompt, padded so word boundaries count."""
+    text = f" {normalize_prompt(prompt)} "
+    counts = {}
+    for start in range(max(1, len(text) - size + 1)):
+        gram = text[start:start + size]
+        counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+class PromptCache:
+    """
+    Cache of (prompt, schema) pairs with near-duplicate lookup.
+    lookup() returns the cached schema of the most similar prompt if its similarity
+    reaches the threshold. The cache is persisted as a JSON file if a path is given.
+    """
+
+    def __init__(self, path=None, threshold=DEFAULT_SIMILARITY_THRESHOLD,
+                 ngram_size=DEFAULT_NGRAM_SIZE, probe_terms=DEFAULT_PROBE_TERMS):
+        self.path = path
+        self.threshold = threshold
+        self.ngram_size = ngram_size
+        self.probe_terms = probe_terms
+        self._prompts = []
+        self._schemas = []
+        self._vectors = [] # n-gram counts per entry
+        self._keys = [] # prompt_key() per entry; only entries with the query's key can match
+        self._postings = {} # n-gram -> list of entry indexes (the document frequency is its length)
+        self._exact = {} # normalized prompt -> entry index
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        return len(self._prompts)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read prompt cache {self.path}, starting empty. Error: {e}")
+            return
+        for entry in entries:
+            self._index(entry["prompt"], entry["schema"])
+
+    def save(self):
+        """Writes the cache to its path (atomically). Does nothing for in-memory caches."""
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump([{"prompt": prompt, "schema": schema} for prompt, schema in zip(self._prompts, self._schemas)], f)
+        os.replace(temp_path, self.path)
+
+    def _index(self, prompt, schema):
+        normalized = normalize_prompt(prompt)
+        entry_index = self._exact.get(normalized)
+        if entry_index is not None: # Same prompt again: keep the newest schema
+            self._schemas[entry_index] = schema
+            return
+        entry_index = len(self._prompts)
+        vector = prompt_ngrams(prompt, self.ngram_size)
+        self._prompts.append(prompt)
+        self._schemas.append(schema)
+        self._vectors.append(vector)
+        self._keys.append(prompt_key(prompt))
+        self._exact[normalized] = entry_index
+        for gram in vector:
+            self._postings.setdefault(gram, []).append(entry_index)
+
+    def add(self, prompt, schema):
+        """Adds a prompt and the (validated) schema generated for it."""
+        self._index(prompt, schema)
+
+    def _idf(self, gram):
+        return math.log((len(self._prompts) + 1) / (len(self._postings.get(gram, ())) + 1)) + 1.0
+
+    def lookup(self, prompt):
+        """
+        Returns (schema, similarity, cached_prompt) for the most similar cached prompt
+        with the same prompt_key() if its cosine similarity is at least the threshold,
+        otherwise None.
+        """
+        if not self._prompts:
+            return None
+        entry_index = self._exact.get(normalize_prompt(prompt))
+        if entry_index is not None:
+            return self._schemas[entry_index], 1.0, self._prompts[entry_index]
+
+        query = prompt_ngrams(prompt, self.ngram_size)
+        # Probe only the rarest n-grams of the query: near-duplicates share most n-grams,
+        # so they almost always share some rare ones, while common n-grams ("the", " a ")
+        # would pull in most of the cache.
+        probes = sorted((gram for gram in query if gram in self._postings), key=lambda gram: len(self._postings[gram]))
+        candidates = set()
+        for gram in probes[:self.probe_terms]:
+            candidates.update(self._postings[gram])
+        key = prompt_key(prompt)
+        candidates = [candidate for candidate in candidates if self._keys[candidate] == key]
+        if not candidates:
+            return None
+
+        idf = {gram: self._idf(gram) for gram in query}
+        query_weights = {gram: count * idf[gram] for gram, count in query.items()}
+        query_norm = math.sqrt(sum(weight * weight for weight in query_weights.values()))
+        best_index = None
+        best_similarity = 0.0
+        for candidate in candidates:
+            vector = self._vectors[candidate]
+            dot = 0.0
+            norm = 0.0
+            for gram, count in vector.items():
+                gram_idf = idf.get(gram)
+                if gram_idf is None:
+                    gram_idf = idf[gram] = self._idf(gram)
+                weight = count * gram_idf
+                norm += weight * weight
+                query_weight = query_weights.get(gram)
+                if query_weight:
+                    dot += weight * query_weight
+            similarity = dot / (query_norm * math.sqrt(norm)) if norm and query_norm else 0.0
+            if similarity > best_similarity:
+                best_index = candidate
+                best_similarity = similarity
+        if best_index is None or best_similarity < self.threshold:
+            return None
+        return self._schemas[best_index], best_similarity, self._prompts[best_index]
+
+
+if __name__ == '__main__':
+    cache = PromptCache()
+    cache.add("an obstacle dodger with a blue square player", {"game_title": "Dodger"})
+    cache.add("a space shooter with 5 red aliens", {"game_title": "Shooter"})
+
+    hit = cache.lookup("obstacle dodger game with blue square player")
+    assert hit is not None and hit[0] == {"game_title": "Dodger"}, hit
+    print(f"Paraphrase without articles reused (similarity {hit[1]:.2f}).")
+
+    assert cache.lookup("a space shooter with 50 red aliens") is None
+    print("A different entity count is not reused.")
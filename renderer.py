@@ -1,6 +1,14 @@
 import pygame
 import os
-import random # For potential use in randomizing obstacle reset
+import time
+from schema_compiler import compile_game_schema
+from simulation import create_world, step_world, DEFAULT_SIM_HZ
+from events import LogSink, CollisionEvent, DestroyedEvent
+from hot_reload import SchemaWatcher, reload_world
+from hud import HudCompositor, load_hud_font
+
+DEFAULT_TARGET_FPS = 60
+MAX_FRAME_TIME_S = 0.25 # Longest real-time gap fed into the simulation accumulator per frame
 
 # Default schema, mainly for internal testing if renderer is run directly.
 # The main execution path via main.py will pass a schema.
@@ -44,335 +52,150 @@ DEFAULT_GAME_SCHEMA_FOR_RENDERER_TEST = { # Renamed to avoid conflict if importe
     "game_rules": ["Test the renderer!"]
 }
 
-def render_game_from_schema(game_schema, output_image_path="frame.png", run_loop=False):
+def draw_entity(screen, shape, color, rect, radius, is_controllable):
+    """Draws one entity. Circles are drawn centered in their 2r x 2r bounding rect."""
+    if shape == "circle":
+        pygame.draw.circle(screen, color, rect.center, radius)
+    else: # Default to rectangle
+        pygame.draw.rect(screen, color, rect)
+    if is_controllable:
+        pygame.draw.rect(screen, (255,255,255), rect, 2) # White border
+
+def read_controls():
+    """Maps the current keyboard state to the simulation's control dict."""
+    keys = pygame.key.get_pressed()
+    return {
+        "left": keys[pygame.K_LEFT],
+        "right": keys[pygame.K_RIGHT],
+        "up": keys[pygame.K_UP],
+        "down": keys[pygame.K_DOWN],
+        "fire": keys[pygame.K_SPACE]
+    }
+
+def draw_world(screen, world, alpha, scratch_rect):
+    """
+    Draws all active entities, interpolated between their previous and current
+    simulation positions by alpha (0..1). scratch_rect is reused to avoid a Rect per entity.
+    """
+    for entities in (world["entities"], world["projectiles"]):
+        for entity in entities:
+            rect = entity["rect"]
+            x = entity["prev_x"] + (entity["x"] - entity["prev_x"]) * alpha
+            y = entity["prev_y"] + (entity["y"] - entity["prev_y"]) * alpha
+            scratch_rect.update(round(x), round(y), rect.width, rect.height)
+            draw_entity(screen, entity["shape"], entity["color_tuple"], scratch_rect, entity["radius"], entity["is_controllable"])
+
+def draw_live_frame(surface, world, alpha, scratch_rect, hud):
+    """Draws one frame of a running world: background, interpolated entities, the rules and the player's health."""
+    game = world["game"]
+    surface.fill(game.background_color)
+    draw_world(surface, world, alpha, scratch_rect)
+
+    # Draw game_rules (one cached surface), with Player Health below them if the player has health
+    if game.game_rules:
+        player_entity = world["player"]
+        health_lines = ()
+        if player_entity and player_entity["health_points"] is not None:
+            health_lines = (f"Player Health: {player_entity['health_points']}",) # Rendered once per value
+        hud.draw(surface, game.game_rules, health_lines)
+
+def draw_initial_frame(surface, game, hud):
+    """Draws the single-frame view of a CompiledGame: every entity at its schema position, plus the rules."""
+    surface.fill(game.background_color)
+    # Draw entities based on their *initial* positions from the compiled schema for a single frame
+    for compiled_entity in game.entities:
+        initial_rect = pygame.Rect(compiled_entity.x, compiled_entity.y, compiled_entity.width, compiled_entity.height)
+        draw_entity(surface, compiled_entity.shape, compiled_entity.color, initial_rect, compiled_entity.radius, compiled_entity.is_controllable)
+
+    # Draw game_rules for single frame
+    hud.draw(surface, game.game_rules)
+
+
+def render_game_from_schema(game_schema, output_image_path="frame.png", run_loop=False, target_fps=DEFAULT_TARGET_FPS, sim_hz=DEFAULT_SIM_HZ, watch_path=None, memory_monitor=None, performance_budget=None):
+    """
+    Renders a game schema. With run_loop, runs the live game: the simulation advances
+    in fixed steps of 1/sim_hz seconds independent of the render rate, and frames are
+    drawn interpolated between steps. target_fps caps the render rate; 0 means uncapped.
+    With watch_path, edits to that schema file are patched into the running game
+    (unless they exceed performance_budget, if given).
+    With a memory_monitor (see memory_monitor.py), the live loop is sampled every few
+    frames and a memory growth report is printed on exit.
+    """
     pygame.init()
 
     try:
-        title = game_schema.get("game_title", "Untitled Game")
-        dimensions = game_schema.get("screen_dimensions", {"width": 800, "height": 600})
-        width = dimensions.get("width", 800)
-        height = dimensions.get("height", 600)
-        bg_color_list = game_schema.get("background_color", [0, 0, 0])
-        bg_color = tuple(bg_color_list) # Pygame needs tuples for colors
+        game = compile_game_schema(game_schema)
+        width = game.width
+        height = game.height
 
         screen = pygame.display.set_mode((width, height))
-        pygame.display.set_caption(title)
+        pygame.display.set_caption(game.title)
 
         # Font for game_rules
-        try:
-            font = pygame.font.Font(None, 28) # Default font, size 28
-        except Exception as e:
-            print(f"Warning: Could not load default font. Game rules will not be displayed. Error: {e}")
-            font = None
-        
-        game_rules_text_surfaces = []
-        if font:
-            rules = game_schema.get("game_rules", [])
-            for i, rule_text in enumerate(rules):
-                try:
-                    text_surface = font.render(rule_text, True, (255, 255, 255)) # White text
-                    game_rules_text_surfaces.append(text_surface)
-                except Exception as e_render:
-                    print(f"Warning: Could not render rule text: '{rule_text}'. Error: {e_render}")
+        hud = HudCompositor(load_hud_font())
 
-        entities_from_schema = game_schema.get("entities", [])
-        
-        # Create a list of entity objects (dictionaries with a 'rect' for Pygame)
-        # This list will be modified during the game loop
-        active_entities = []
-        for entity_data in entities_from_schema:
-            # Make a copy to avoid modifying the original schema dict directly if it's reused
-            entity_copy = entity_data.copy() 
-            entity_copy["rect"] = pygame.Rect(
-                entity_copy.get("position", {}).get("x", 0),
-                entity_copy.get("position", {}).get("y", 0),
-                entity_copy.get("size", {}).get("width", 10),
-                entity_copy.get("size", {}).get("height", 10)
-            )
-            # Ensure color is a tuple
-            entity_copy["color_tuple"] = tuple(entity_copy.get("color", [255, 255, 255]))
-            
-            # Get new properties with defaults from schema or general defaults
-            entity_copy["is_controllable"] = entity_copy.get("is_controllable", False)
-            entity_copy["movement_pattern"] = entity_copy.get("movement_pattern", "static")
-            entity_copy["speed"] = entity_copy.get("speed", 0)
-            if entity_copy["movement_pattern"] == "moving_left_right_patrol":
-                entity_copy["patrol_direction"] = 1 # 1 for right, -1 for left
-            active_entities.append(entity_copy)
-        
-        player_entity = None
-        for entity in active_entities:
-            if entity["is_controllable"] and entity["movement_pattern"] == "player_horizontal_control":
-                if player_entity is None:
-                    player_entity = entity
-                else:
-                    print("Warning: Multiple controllable entities for horizontal control. Using the first one.")
-        
         if run_loop:
+            world = create_world(game)
+            # Collision/destroy messages go through a background sink instead of print() in the frame
+            log_sink = LogSink()
+            world["events"].subscribe(log_sink, (CollisionEvent, DestroyedEvent))
             running = True
             clock = pygame.time.Clock()
-            FPS = 30 
+            sim_dt = 1.0 / sim_hz
+            accumulator = 0.0
+            scratch_rect = pygame.Rect(0, 0, 0, 0)
+            watcher = SchemaWatcher(watch_path) if watch_path else None
+            if memory_monitor:
+                memory_monitor.start()
+            previous_time = time.perf_counter()
 
-            projectile_id_counter = 0 # Initialize counter for unique projectile IDs
             while running:
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         running = False
-                
-                # Player control
-                if player_entity:
-                    keys = pygame.key.get_pressed()
-                    player_speed = player_entity.get("speed", 5) # Using a default of 5 if speed is 0 or not set
-                    
-                    current_pattern = player_entity.get("movement_pattern")
-                    
-                    if current_pattern == "player_horizontal_control":
-                        if keys[pygame.K_LEFT]:
-                            player_entity["rect"].x -= player_speed
-                        if keys[pygame.K_RIGHT]:
-                            player_entity["rect"].x += player_speed
-                    elif current_pattern == "player_omni_directional_control":
-                        if keys[pygame.K_LEFT]:
-                            player_entity["rect"].x -= player_speed
-                        if keys[pygame.K_RIGHT]:
-                            player_entity["rect"].x += player_speed
-                        if keys[pygame.K_UP]:
-                            player_entity["rect"].y -= player_speed
-                        if keys[pygame.K_DOWN]:
-                            player_entity["rect"].y += player_speed
-                    
-                    # Keep player within screen bounds
-                    current_pattern_bounds_check = player_entity.get("movement_pattern") # Re-get in case it changed, though unlikely here
-                    if current_pattern_bounds_check == "player_horizontal_control" or current_pattern_bounds_check == "player_omni_directional_control":
-                        if player_entity["rect"].left < 0:
-                            player_entity["rect"].left = 0
-                        if player_entity["rect"].right > width:
-                            player_entity["rect"].right = width
-                        if current_pattern_bounds_check == "player_omni_directional_control":
-                            if player_entity["rect"].top < 0:
-                                player_entity["rect"].top = 0
-                            if player_entity["rect"].bottom > height:
-                                player_entity["rect"].bottom = height
-                        # Shooting (if player can shoot)
-                        if player_entity.get("can_shoot") and keys[pygame.K_SPACE]:
-                            now = pygame.time.get_ticks()
-                            last_shot_time = player_entity.get("last_shot_time", 0)
-                            # Cooldown from projectile_archetype or a default
-                            shoot_cooldown = player_entity.get("projectile_archetype", {}).get("cooldown_ms", 250) 
-
-                            if now - last_shot_time > shoot_cooldown:
-                                player_entity["last_shot_time"] = now
-                                archetype = player_entity.get("projectile_archetype")
-                                if archetype:
-                                    projectile_id_counter += 1 # Increment for next
-                                    
-                                    # Prepare projectile data from archetype
-                                    new_projectile = {
-                                        "id": f"{archetype.get('id_prefix', 'proj_')}{projectile_id_counter}",
-                                        "name": f"{archetype.get('name_prefix', 'Projectile ')}{projectile_id_counter}",
-                                        "type": archetype.get("type", "projectile"), # Should be 'projectile'
-                                        "shape": archetype.get("shape", "rectangle"),
-                                        "color_tuple": tuple(archetype.get("color", [255, 255, 0])),
-                                        "size_data": archetype.get("size"), # Raw size data from schema
-                                        "speed": archetype.get("speed", 10),
-                                        "movement_pattern": archetype.get("movement_pattern", "projectile_movement"),
-                                        "damage": archetype.get("damage", 1),
-                                        "lifespan_ms": archetype.get("lifespan_ms"),
-                                        "spawn_time_ms": now if archetype.get("lifespan_ms") else None,
-                                        # Ensure projectiles are not controllable and have no patrol direction by default
-                                        "is_controllable": False, 
-                                        "patrol_direction": 0 
-                                    }
-                                    
-                                    # Calculate initial position and rect for projectile
-                                    proj_size_data = new_projectile["size_data"]
-                                    if new_projectile["shape"] == "circle":
-                                        proj_radius = proj_size_data.get("radius", 5)
-                                        proj_width, proj_height = proj_radius * 2, proj_radius * 2
-                                    else: # rectangle
-                                        proj_width = proj_size_data.get("width", 10)
-                                        proj_height = proj_size_data.get("height", 5)
-                                    
-                                    # Spawn projectile from center-top of player
-                                    new_projectile["rect"] = pygame.Rect(
-                                        player_entity["rect"].centerx - proj_width // 2,
-                                        player_entity["rect"].top - proj_height, 
-                                        proj_width,
-                                        proj_height
-                                    )
-                                    active_entities.append(new_projectile)
-                                    # print(f"Fired: {new_projectile['id']} at {new_projectile['rect']}") # Debug
-
-                # Update other entities
-                for entity in active_entities:
-                    if entity.get("movement_pattern") == "falling_down":
-                        entity["rect"].y += entity.get("speed", 0)
-                        if entity["rect"].top > height: # If entity is past the bottom edge
-                            entity["rect"].y = 0 - entity["rect"].height # Reset to top, above screen
-                            # Randomize x position for falling objects upon reset
-                            if entity["rect"].width < width : # ensure it's not wider than screen
-                                entity["rect"].x = random.randint(0, width - entity["rect"].width)
-                            else:
-                                entity["rect"].x = 0
-                    elif entity.get("movement_pattern") == "moving_left_right_patrol":
-                        speed = entity.get("speed", 0)
-                        direction = entity.get("patrol_direction", 1)
-                        entity["rect"].x += speed * direction
-                        
-                        if entity["rect"].left < 0:
-                            entity["rect"].left = 0
-                            entity["patrol_direction"] = 1 # Change direction to right
-                        elif entity["rect"].right > width:
-                            entity["rect"].right = width
-                            entity["patrol_direction"] = -1 # Change direction to left
-                    elif entity.get("movement_pattern") == "projectile_movement":
-                        entity["rect"].y -= entity.get("speed", 10) # Move upwards
-                        
-                        # Check lifespan
-                        if entity.get("lifespan_ms") is not None and entity.get("spawn_time_ms") is not None:
-                            now = pygame.time.get_ticks()
-                            if now - entity["spawn_time_ms"] > entity["lifespan_ms"]:
-                                if entity in active_entities: # Ensure it's still there
-                                    active_entities.remove(entity)
-                                    # print(f"Projectile {entity.get('id')} expired by lifespan.") # Debug
-                                    continue # Skip further processing for this removed entity
-                        
-                        # Remove if off-screen (top)
-                        if entity["rect"].bottom < 0:
-                            if entity in active_entities: # Check if not already removed by lifespan
-                                active_entities.remove(entity)
-                                # print(f"Projectile {entity.get('id')} went off-screen (top).") # Debug
-                                continue # Skip further processing
-
-                # Collision detection
-                entities_to_remove = []
-                if player_entity:
-                    # Iterate over a copy of active_entities if we modify it during iteration (e.g. removing projectiles/enemies)
-                    for entity in list(active_entities): # Iterate over a copy
 
-                        # 1. Player vs. Other Entities (excluding projectiles from player)
-                        if entity is not player_entity and entity.get("type") != "projectile":
-                            if player_entity["rect"].colliderect(entity["rect"]):
-                                print(f"[COLLISION] Player '{player_entity.get('name', player_entity.get('id'))}' collided with '{entity.get('name', entity.get('id'))}' ({entity.get('type')})")
-                                if entity.get("type") == "enemy":
-                                    # Player takes damage or game over, for now just print
-                                    player_health = player_entity.get("health_points")
-                                    if player_health is not None:
-                                        # player_entity["health_points"] -= 1 # Example damage, can be made configurable
-                                        # print(f"Player health: {player_entity['health_points']}")
-                                        # if player_entity["health_points"] <= 0:
-                                        #     print("Game Over!")
-                                        #     running = False # End game
-                                        pass # Placeholder for player damage logic
-
-                        # 2. Projectiles vs. Other Entities
-                        if entity.get("type") == "projectile":
-                            # Ensure projectile itself is still active before checking its collisions
-                            if entity in entities_to_remove: # Already marked for removal by lifespan or off-screen
-                                continue
-
-                            for target_entity in list(active_entities):
-                                # Projectile should not collide with player who fired it (or other projectiles for now)
-                                # Also, target should not be the projectile itself, and target should not be already marked for removal
-                                if target_entity is player_entity or target_entity.get("type") == "projectile" or target_entity is entity or target_entity in entities_to_remove:
-                                    continue
-
-                                if entity["rect"].colliderect(target_entity["rect"]):
-                                    print(f"[COLLISION] Projectile '{entity.get('name', entity.get('id'))}' hit '{target_entity.get('name', target_entity.get('id'))}' ({target_entity.get('type')})")
-                                    
-                                    # Mark projectile for removal
-                                    if entity not in entities_to_remove:
-                                        entities_to_remove.append(entity)
-                                    
-                                    if target_entity.get("type") == "enemy":
-                                        target_health = target_entity.get("health_points")
-                                        if target_health is not None:
-                                            target_entity["health_points"] = target_health - entity.get("damage", 1)
-                                            # print(f"Enemy '{target_entity.get('name', target_entity.get('id'))}' health: {target_entity['health_points']}")
-                                            if target_entity["health_points"] <= 0:
-                                                if target_entity not in entities_to_remove:
-                                                    entities_to_remove.append(target_entity)
-                                                print(f"Enemy '{target_entity.get('name', target_entity.get('id'))}' destroyed.")
-                                    break # Projectile hits one target and is done for this frame's check
-
-                # Remove entities marked for removal
-                if entities_to_remove:
-                    active_entities = [e for e in active_entities if e not in entities_to_remove]
-                    # Update player_entity reference if it was removed (e.g. game over)
-                    if player_entity in entities_to_remove:
-                        player_entity = None 
+                now = time.perf_counter()
+                if watcher:
+                    new_schema = watcher.poll(now)
+                    if new_schema is not None:
+                        diff = reload_world(world, game_schema, new_schema, performance_budget, sim_hz)
+                        if diff is not None:
+                            game_schema = new_schema
+                            if diff["game_changed"]:
+                                game = world["game"]
+                                if screen.get_size() != (game.width, game.height):
+                                    screen = pygame.display.set_mode((game.width, game.height))
+                                pygame.display.set_caption(game.title)
+
+                # Clamp long stalls so a hitch doesn't trigger a burst of catch-up steps
+                accumulator += min(now - previous_time, MAX_FRAME_TIME_S)
+                previous_time = now
+
+                controls = read_controls()
+                while accumulator >= sim_dt:
+                    step_world(world, sim_dt, controls)
+                    accumulator -= sim_dt
+                world["events"].flush() # Deliver this frame's events to subscribers in one batch
+                if memory_monitor:
+                    memory_monitor.maybe_sample(world)
 
                 # Drawing
-                screen.fill(bg_color)
-                for entity in active_entities:
-                    shape = entity.get("shape", "rectangle") # Default to rectangle
-                    color = entity["color_tuple"]
-                    rect = entity["rect"]
-
-                    if shape == "circle":
-                        radius = entity.get("size", {}).get("radius", rect.width // 2) 
-                        # Pygame's circle center is based on the rect's top-left for consistency if only rect is updated
-                        # The rect itself defines the bounding box of the circle.
-                        # So, center_x should be rect.centerx and center_y should be rect.centery
-                        # And radius should be rect.width / 2 (or height / 2, assuming it's a circle)
-                        # For simplicity and direct use of schema's radius:
-                        center_x = rect.x + radius # Assuming rect.x, rect.y is top-left of bounding box
-                        center_y = rect.y + radius # Assuming rect.x, rect.y is top-left of bounding box
-                        pygame.draw.circle(screen, color, (center_x, center_y), radius)
-                    else: # Default to rectangle
-                        pygame.draw.rect(screen, color, rect)
-                    if entity["is_controllable"]: 
-                         pygame.draw.rect(screen, (255,255,255), entity["rect"], 2) # White border
-                
-                # Draw game_rules
-                if font and game_rules_text_surfaces:
-                    for i, text_surface in enumerate(game_rules_text_surfaces):
-                        screen.blit(text_surface, (10, 10 + i * 25)) # Position rules at top-left
-                    # Draw Player Health (if player exists and has health)
-                    if player_entity and player_entity.get("health_points") is not None and font:
-                        health_text = f"Player Health: {player_entity['health_points']}"
-                        try:
-                            health_surface = font.render(health_text, True, (255, 255, 255)) # White text
-                            # Position health below game rules
-                            rules_height = len(game_rules_text_surfaces) * 25 
-                            screen.blit(health_surface, (10, 10 + rules_height + 5)) # 5px padding
-                        except Exception as e_render_health:
-                            print(f"Warning: Could not render health text. Error: {e_render_health}")
+                draw_live_frame(screen, world, accumulator / sim_dt, scratch_rect, hud)
 
                 pygame.display.flip()
-                clock.tick(FPS)
+                clock.tick(target_fps) # A framerate of 0 leaves the loop uncapped
             
+            world["events"].flush()
+            log_sink.close()
+            print(f"Event counts: {world['events'].counts}")
+            if memory_monitor:
+                memory_monitor.sample(world)
+                memory_monitor.stop()
+                print(memory_monitor.report())
             print("Exiting Pygame loop.")
 
         else: # Just save a single frame
-            screen.fill(bg_color)
-            # Draw entities based on their *initial* positions from the schema for a single frame
-            for entity_data_original in entities_from_schema:
-                pos_x = entity_data_original.get("position", {}).get("x", 0)
-                pos_y = entity_data_original.get("position", {}).get("y", 0)
-                shape = entity_data_original.get("shape", "rectangle")
-                
-                if shape == "circle":
-                    radius = entity_data_original.get("size", {}).get("radius", 10)
-                    initial_rect = pygame.Rect(pos_x, pos_y, radius * 2, radius * 2)
-                else: # rectangle
-                    width = entity_data_original.get("size", {}).get("width", 10)
-                    height = entity_data_original.get("size", {}).get("height", 10)
-                    initial_rect = pygame.Rect(pos_x, pos_y, width, height)
-                color_tuple = tuple(entity_data_original.get("color", [255,255,255]))
-                # shape is already defined from when initial_rect was created
-                if shape == "circle": 
-                    radius = entity_data_original.get("size", {}).get("radius", initial_rect.width // 2)
-                    pygame.draw.circle(screen, color_tuple, initial_rect.center, radius)
-                else: # Default to rectangle
-                    pygame.draw.rect(screen, color_tuple, initial_rect)
-                if entity_data_original.get("is_controllable", False):
-                     pygame.draw.rect(screen, (255,255,255), initial_rect, 2) # White border
-
-            # Draw game_rules for single frame
-            if font and game_rules_text_surfaces:
-                for i, text_surface in enumerate(game_rules_text_surfaces):
-                    screen.blit(text_surface, (10, 10 + i * 25))
+            draw_initial_frame(screen, game, hud)
 
             try:
                 pygame.image.save(screen, output_image_path)
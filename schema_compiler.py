@@ -0,0 +1,251 @@
+from typing import NamedTuple
+
+# Defaults applied once when a validated schema is compiled. Everything downstream
+# (simulation, live renderer, single-frame thumbnail) reads the compiled values and
+# never falls back to ad hoc .get() defaults of its own.
+DEFAULT_SCREEN_WIDTH = 800
+DEFAULT_SCREEN_HEIGHT = 600
+DEFAULT_BACKGROUND_COLOR = (0, 0, 0)
+DEFAULT_ENTITY_COLOR = (255, 255, 255)
+DEFAULT_ENTITY_WIDTH = 10
+DEFAULT_ENTITY_HEIGHT = 10
+DEFAULT_MOVEMENT_PATTERN = "static"
+DEFAULT_SPEED = 0
+
+DEFAULT_PROJECTILE_ID_PREFIX = "proj_"
+DEFAULT_PROJECTILE_NAME_PREFIX = "Projectile "
+DEFAULT_PROJECTILE_COLOR = (255, 255, 0)
+DEFAULT_PROJECTILE_WIDTH = 10
+DEFAULT_PROJECTILE_HEIGHT = 5
+DEFAULT_PROJECTILE_RADIUS = 5
+DEFAULT_PROJECTILE_SPEED = 10
+DEFAULT_PROJECTILE_DAMAGE = 1
+DEFAULT_PROJECTILE_COOLDOWN_MS = 250
+
+DEFAULT_SPAWNER_MAX_ALIVE = 100
+
+PLAYER_CONTROL_PATTERNS = ("player_horizontal_control", "player_omni_directional_control")
+
+
+class CompiledProjectileArchetype(NamedTuple):
+    id_prefix: str
+    name_prefix: str
+    type: str
+    shape: str
+    color: tuple
+    width: int
+    height: int
+    radius: int | None  # Only set for circles; width == height == 2 * radius then.
+    speed: int
+    movement_pattern: str
+    damage: int
+    lifespan_ms: int | None  # None (or 0 in the schema) means the projectile never expires.
+    cooldown_ms: int
+    direction: tuple | None = None  # Unit (x, y) vector; None means the owner team's default.
+    aim_at_player: bool = False
+
+
+class CompiledEntity(NamedTuple):
+    id: str
+    name: str
+    type: str
+    shape: str
+    color: tuple
+    x: int
+    y: int
+    width: int
+    height: int
+    radius: int | None
+    is_controllable: bool
+    movement_pattern: str
+    speed: int
+    health_points: int | None
+    can_shoot: bool
+    projectile_archetype: CompiledProjectileArchetype | None
+
+
+class CompiledWave(NamedTuple):
+    at_ms: int
+    count: int
+    spacing_ms: int
+
+
+class CompiledSpawner(NamedTuple):
+    id: str
+    id_prefix: str
+    name_prefix: str
+    archetype: CompiledEntity  # Template entity; x/y are replaced at spawn time.
+    interval_ms: int | None  # None for wave-only spawners.
+    start_ms: int
+    end_ms: int | None
+    max_alive: int
+    waves: tuple
+    x_min: int
+    x_max: int  # Right edge limit for the spawned entity's box.
+    y: int
+
+
+class CompiledGame(NamedTuple):
+    title: str
+    width: int
+    height: int
+    background_color: tuple
+    entities: tuple
+    game_rules: tuple
+    player_index: int | None  # Index into entities of the controllable player, if any.
+    spawners: tuple = ()
+
+
+def _resolve_shape_and_size(shape, size_data, default_width, default_height, default_radius):
+    """
+    Resolves the shape and bounding box of an entity or projectile.
+    Circles always get a square 2r x 2r box, so the hitbox matches what is drawn.
+    Returns (shape, width, height, radius).
+    """
+    size_data = size_data or {}
+    if shape is None:
+        # Infer circles from radius-only sizes instead of silently using a default rectangle.
+        shape = "circle" if "radius" in size_data and "width" not in size_data else "rectangle"
+
+    if shape == "circle":
+        radius = size_data.get("radius")
+        if radius is None:
+            if "width" in size_data or "height" in size_data:
+                radius = min(size_data.get("width", default_width), size_data.get("height", default_height)) // 2
+            else:
+                radius = default_radius
+        radius = max(1, radius)
+        return "circle", radius * 2, radius * 2, radius
+
+    width = size_data.get("width")
+    height = size_data.get("height")
+    if width is None and height is None and "radius" in size_data:
+        width = height = size_data["radius"] * 2
+    return "rectangle", width or default_width, height or default_height, None
+
+
+def compile_projectile_archetype(archetype_data):
+    """Compiles a projectile_archetype dict into a fully-defaulted CompiledProjectileArchetype."""
+    shape, width, height, radius = _resolve_shape_and_size(
+        archetype_data.get("shape", "rectangle"),
+        archetype_data.get("size"),
+        DEFAULT_PROJECTILE_WIDTH,
+        DEFAULT_PROJECTILE_HEIGHT,
+        DEFAULT_PROJECTILE_RADIUS
+    )
+    lifespan_ms = archetype_data.get("lifespan_ms")
+    direction = None
+    direction_data = archetype_data.get("direction")
+    if direction_data:
+        dx = direction_data.get("x", 0)
+        dy = direction_data.get("y", 0)
+        length = (dx * dx + dy * dy) ** 0.5
+        if length > 0:
+            direction = (dx / length, dy / length)
+    return CompiledProjectileArchetype(
+        id_prefix=archetype_data.get("id_prefix", DEFAULT_PROJECTILE_ID_PREFIX),
+        name_prefix=archetype_data.get("name_prefix", DEFAULT_PROJECTILE_NAME_PREFIX),
+        type=archetype_data.get("type", "projectile"),
+        shape=shape,
+        color=tuple(archetype_data.get("color", DEFAULT_PROJECTILE_COLOR)),
+        width=width,
+        height=height,
+        radius=radius,
+        speed=archetype_data.get("speed", DEFAULT_PROJECTILE_SPEED),
+        movement_pattern=archetype_data.get("movement_pattern", "projectile_movement"),
+        damage=archetype_data.get("damage", DEFAULT_PROJECTILE_DAMAGE),
+        lifespan_ms=lifespan_ms if lifespan_ms else None,
+        cooldown_ms=archetype_data.get("cooldown_ms", DEFAULT_PROJECTILE_COOLDOWN_MS),
+        direction=direction,
+        aim_at_player=archetype_data.get("aim_at_player", False)
+    )
+
+
+def compile_entity(entity_data):
+    """Compiles a single schema entity dict into a fully-defaulted CompiledEntity."""
+    shape, width, height, radius = _resolve_shape_and_size(
+        entity_data.get("shape"),
+        entity_data.get("size"),
+        DEFAULT_ENTITY_WIDTH,
+        DEFAULT_ENTITY_HEIGHT,
+        DEFAULT_ENTITY_WIDTH // 2
+    )
+    position = entity_data.get("position", {})
+    archetype_data = entity_data.get("projectile_archetype")
+    return CompiledEntity(
+        id=entity_data.get("id", ""),
+        name=entity_data.get("name", entity_data.get("id", "")),
+        type=entity_data.get("type", "obstacle"),
+        shape=shape,
+        color=tuple(entity_data.get("color", DEFAULT_ENTITY_COLOR)),
+        x=position.get("x", 0),
+        y=position.get("y", 0),
+        width=width,
+        height=height,
+        radius=radius,
+        is_controllable=entity_data.get("is_controllable", False),
+        movement_pattern=entity_data.get("movement_pattern", DEFAULT_MOVEMENT_PATTERN),
+        speed=entity_data.get("speed", DEFAULT_SPEED),
+        health_points=entity_data.get("health_points"),
+        can_shoot=entity_data.get("can_shoot", False),
+        projectile_archetype=compile_projectile_archetype(archetype_data) if archetype_data else None
+    )
+
+
+def compile_spawner(spawner_data, screen_width):
+    """Compiles a spawner dict into a CompiledSpawner. The archetype is compiled like an entity."""
+    spawner_id = spawner_data.get("id", "spawner")
+    archetype_data = dict(spawner_data.get("entity_archetype", {}))
+    archetype_data.setdefault("id", spawner_id)
+    archetype = compile_entity(archetype_data)
+    area = spawner_data.get("spawn_area", {})
+    waves = tuple(
+        CompiledWave(at_ms=wave.get("at_ms", 0), count=wave.get("count", 1), spacing_ms=wave.get("spacing_ms", 0))
+        for wave in spawner_data.get("waves", [])
+    )
+    return CompiledSpawner(
+        id=spawner_id,
+        id_prefix=archetype_data.get("id_prefix", f"{spawner_id}_"),
+        name_prefix=archetype_data.get("name_prefix", f"{spawner_id} "),
+        archetype=archetype,
+        interval_ms=spawner_data.get("interval_ms"),
+        start_ms=spawner_data.get("start_ms", 0),
+        end_ms=spawner_data.get("end_ms"),
+        max_alive=spawner_data.get("max_alive", DEFAULT_SPAWNER_MAX_ALIVE),
+        waves=waves,
+        x_min=area.get("x_min", 0),
+        x_max=area.get("x_max", screen_width),
+        y=area.get("y", -archetype.height) # Just above the top edge by default
+    )
+
+
+def compile_game_schema(game_schema):
+    """
+    Turns a validated game schema into an immutable, fully-defaulted CompiledGame.
+    The schema dict itself is not modified. Compile once, then share the result
+    between the simulation, the live renderer and the single-frame thumbnailer.
+    """
+    dimensions = game_schema.get("screen_dimensions", {})
+    entities = tuple(compile_entity(entity_data) for entity_data in game_schema.get("entities", []))
+
+    player_index = None
+    for index, entity in enumerate(entities):
+        if entity.is_controllable and entity.movement_pattern in PLAYER_CONTROL_PATTERNS:
+            if player_index is None:
+                player_index = index
+            else:
+                print("Warning: Multiple controllable entities found. Using the first one.")
+
+    return CompiledGame(
+        title=game_schema.get("game_title", "Untitled Game"),
+        width=dimensions.get("width", DEFAULT_SCREEN_WIDTH),
+        height=dimensions.get("height", DEFAULT_SCREEN_HEIGHT),
+        background_color=tuple(game_schema.get("background_color", DEFAULT_BACKGROUND_COLOR)),
+        entities=entities,
+        game_rules=tuple(game_schema.get("game_rules", [])),
+        player_index=player_index,
+        spawners=tuple(
+            compile_spawner(spawner_data, dimensions.get("width", DEFAULT_SCREEN_WIDTH))
+            for spawner_data in game_schema.get("spawners", [])
+        )
+    )
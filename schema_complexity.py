@@ -0,0 +1,269 @@
+import argparse
+import json
+import math
+
+from game_schema_validator import find_schema_error
+from schema_compiler import compile_game_schema, DEFAULT_SPAWNER_MAX_ALIVE
+from simulation import SCHEMA_SPEED_FRAME_RATE, DEFAULT_SIM_HZ
+
+# Static worst-case cost estimate of a validated game schema, computed from its
+# compiled form without running it. Schema validity says nothing about how expensive
+# a game is to run: a turret with a short cooldown and no lifespan_ms, or a spawner
+# with a high max_alive, is valid but can bring the live loop to single-digit FPS.
+#
+# Estimates are upper bounds under these assumptions:
+#   - the player holds fire the whole time, every other shooter fires on every cooldown;
+#   - a projectile lives until its lifespan_ms runs out or it has travelled the screen
+#     diagonal, whichever comes first (it is dropped once fully off screen);
+#   - a spawned entity lives until it falls (or rises) off screen, and forever for
+#     patterns that never leave; spawners are additionally capped by max_alive and by
+#     the total number of spawns they can make;
+#   - nothing is destroyed by collisions.
+# Unbounded quantities are reported as math.inf.
+
+# Measured headless: ~1000 live objects cost ~9 ms per frame (simulation and drawing)
+# on a desktop CPU, so these limits leave room for slower kiosk hardware at 60 FPS.
+DEFAULT_PERFORMANCE_BUDGET = {
+    "max_live_entities": 1000, # Entities and projectiles alive at the same time
+    "max_collision_pairs": 100000, # Candidate pairs tested per simulation tick
+    "max_draw_calls": 1200, # pygame.draw / blit calls per rendered frame
+    "max_overdraw": 8.0 # Pixels drawn per frame, in screens' worth of pixels
+}
+
+
+class BudgetExceededError(Exception):
+    """Raised by enforce_performance_budget() when a schema's estimated cost exceeds the budget."""
+
+    def __init__(self, violations, report):
+        super().__init__("; ".join(violations))
+        self.violations = violations
+        self.report = report
+
+
+def _effective_cooldown_ms(cooldown_ms, tick_ms):
+    """A shooter fires once now - last_shot_time > cooldown_ms, which is checked once per tick."""
+    return (math.floor(max(cooldown_ms, 0) / tick_ms) + 1) * tick_ms
+
+
+def _projectile_lifetime_ms(archetype, game, tick_ms):
+    """Longest time a projectile of archetype can stay in the world."""
+    lifetime_ms = math.inf
+    if archetype.lifespan_ms:
+        lifetime_ms = archetype.lifespan_ms + tick_ms # Expiry is checked after the move, on the next tick
+    speed = abs(archetype.speed) * SCHEMA_SPEED_FRAME_RATE # pixels per second
+    if speed > 0:
+        # Fired from anywhere on screen, it is fully off screen after at most the diagonal
+        distance = math.hypot(game.width + archetype.width, game.height + archetype.height)
+        lifetime_ms = min(lifetime_ms, distance / speed * 1000.0 + tick_ms)
+    return lifetime_ms
+
+
+def _live_projectiles(archetype, game, tick_ms):
+    """Worst-case number of live projectiles fired by one shooter with this archetype."""
+    lifetime_ms = _projectile_lifetime_ms(archetype, game, tick_ms)
+    if lifetime_ms == math.inf:
+        return math.inf
+    return math.ceil(lifetime_ms / _effective_cooldown_ms(archetype.cooldown_ms, tick_ms))
+
+
+def _spawned_lifetime_ms(spawner, game):
+    """How long one spawned entity stays before it leaves the world on its own."""
+    archetype = spawner.archetype
+    speed = abs(archetype.speed) * SCHEMA_SPEED_FRAME_RATE
+    if archetype.movement_pattern == "falling_down" and archetype.speed > 0:
+        return max(0, game.height - spawner.y + 1) / speed * 1000.0 # Removed once its top passes the bottom edge
+    if archetype.movement_pattern == "projectile_movement" and archetype.speed > 0:
+        return max(0, spawner.y + archetype.height) / speed * 1000.0 # Removed once its bottom passes the top edge
+    return math.inf
+
+
+def _live_spawned(spawner, game, tick_ms):
+    """Worst-case number of entities alive at once from one spawner."""
+    total_spawns = sum(wave.count for wave in spawner.waves)
+    if spawner.interval_ms:
+        if spawner.end_ms is None:
+            total_spawns = math.inf
+        else:
+            total_spawns += max(0, (spawner.end_ms - spawner.start_ms) // spawner.interval_ms + 1)
+
+    lifetime_ms = _spawned_lifetime_ms(spawner, game)
+    by_rate = sum(wave.count for wave in spawner.waves) # Waves may overlap, count them whole
+    if spawner.interval_ms:
+        interval_ms = max(spawner.interval_ms, tick_ms) # At most one continuous spawn per tick
+        by_rate += math.inf if lifetime_ms == math.inf else math.ceil(lifetime_ms / interval_ms) + 1
+    return min(spawner.max_alive, total_spawns, by_rate)
+
+
+def _product(count, per_item):
+    """count * per_item, where zero of an unbounded quantity is zero (not NaN)."""
+    return 0 if count == 0 or per_item == 0 else count * per_item
+
+
+def _draw_area(width, height, screen_area):
+    return min(width * height, screen_area) # Drawing is clipped to the screen
+
+
+def analyze_schema_complexity(game_schema, sim_hz=DEFAULT_SIM_HZ):
+    """
+    Estimates the worst-case runtime cost of a validated schema. Returns a dict with
+    live_entities, live_projectiles, live_total, collision_pairs (per tick), draw_calls
+    and draw_pixels (per frame), overdraw (draw_pixels / screen pixels) and notes
+    (human-readable explanations of the largest or unbounded contributions).
+    """
+    game = compile_game_schema(game_schema)
+    tick_ms = 1000.0 / sim_hz
+    screen_area = max(1, game.width * game.height)
+    notes = []
+
+    # (compiled entity, worst-case number alive) for fixed and spawned entities
+    populations = [(entity, 1) for entity in game.entities]
+    for spawner, spawner_data in zip(game.spawners, game_schema.get("spawners", [])):
+        live = _live_spawned(spawner, game, tick_ms)
+        populations.append((spawner.archetype, live))
+        if "max_alive" not in spawner_data and live == DEFAULT_SPAWNER_MAX_ALIVE:
+            notes.append(
+                f"Spawner '{spawner.id}' has no max_alive; the default cap of {DEFAULT_SPAWNER_MAX_ALIVE} live entities applies."
+            )
+
+    player = game.entities[game.player_index] if game.player_index is not None else None
+    live_entities = 0
+    draw_calls = 1 # Background fill
+    draw_pixels = screen_area
+    player_shots = 0
+    hostile_shots = 0
+    projectile_pixels = 0
+    for entity, live in populations:
+        live_entities += live
+        draw_calls += _product(live, 2 if entity.is_controllable else 1) # Controllable entities get a border
+        draw_pixels += _product(live, _draw_area(entity.width, entity.height, screen_area))
+        if entity.width * entity.height > screen_area:
+            notes.append(f"Entity '{entity.id}' ({entity.width}x{entity.height}) is larger than the {game.width}x{game.height} screen.")
+
+        archetype = entity.projectile_archetype
+        if not entity.can_shoot or archetype is None or live == 0:
+            continue
+        if entity.is_controllable and entity is not player:
+            continue # Only the player fires on input; other controllable entities never fire
+        shots = _product(live, _live_projectiles(archetype, game, tick_ms))
+        if shots > 100:
+            lifetime_s = _projectile_lifetime_ms(archetype, game, tick_ms) / 1000.0
+            notes.append(
+                f"'{entity.id}' can have {shots} projectiles alive ({live} shooter(s), "
+                f"cooldown_ms {archetype.cooldown_ms}, projectiles live up to {lifetime_s:.1f} s)."
+            )
+        if entity.type == "player":
+            player_shots += shots
+        else:
+            hostile_shots += shots
+        projectile_pixels += _product(shots, _draw_area(archetype.width, archetype.height, screen_area))
+
+    live_projectiles = player_shots + hostile_shots
+    draw_calls += live_projectiles + len(game.game_rules)
+    if player is not None and player.health_points is not None and game.game_rules:
+        draw_calls += 1 # Health line
+    draw_pixels += projectile_pixels
+
+    # Per tick: the player against every other entity, player shots against every
+    # other entity, hostile shots against the player (see simulation._resolve_collisions)
+    hostile_targets = live_entities - (1 if player is not None else 0)
+    collision_pairs = _product(player_shots, hostile_targets)
+    if player is not None:
+        collision_pairs += hostile_targets + hostile_shots
+
+    return {
+        "title": game.title,
+        "live_entities": live_entities,
+        "live_projectiles": live_projectiles,
+        "live_total": live_entities + live_projectiles,
+        "collision_pairs": collision_pairs,
+        "draw_calls": draw_calls,
+        "draw_pixels": draw_pixels,
+        "overdraw": draw_pixels / screen_area,
+        "notes": notes
+    }
+
+
+def check_performance_budget(report, budget=None):
+    """Returns a list of messages, one per budget limit the report exceeds (empty if within budget)."""
+    budget = dict(DEFAULT_PERFORMANCE_BUDGET, **(budget or {}))
+    checks = (
+        ("live_total", "max_live_entities", "live entities and projectiles"),
+        ("collision_pairs", "max_collision_pairs", "collision pairs per tick"),
+        ("draw_calls", "max_draw_calls", "draw calls per frame"),
+        ("overdraw", "max_overdraw", "screens of overdraw per frame")
+    )
+    violations = []
+    for key, limit_key, label in checks:
+        limit = budget.get(limit_key)
+        if limit is not None and (not math.isfinite(report[key]) or report[key] > limit): # NaN never compares greater
+            violations.append(f"{_format_count(report[key])} {label} (budget {_format_count(limit)})")
+    return violations
+
+
+def enforce_performance_budget(game_schema, budget=None, sim_hz=DEFAULT_SIM_HZ):
+    """
+    Analyzes a validated schema and raises BudgetExceededError if it exceeds the budget.
+    Returns the analysis report otherwise.
+    """
+    report = analyze_schema_complexity(game_schema, sim_hz)
+    violations = check_performance_budget(report, budget)
+    if violations:
+        raise BudgetExceededError(violations, report)
+    return report
+
+
+def load_performance_budget(path):
+    """Reads budget overrides from a JSON file, e.g. {"max_live_entities": 500}."""
+    with open(path, 'r') as f:
+        budget = json.load(f)
+    unknown = set(budget) - set(DEFAULT_PERFORMANCE_BUDGET)
+    if unknown:
+        raise ValueError(f"Unknown budget keys: {', '.join(sorted(unknown))}")
+    return budget
+
+
+def _format_count(value):
+    if not math.isfinite(value):
+        return "unbounded"
+    if isinstance(value, float) and not value.is_integer():
+        return f"{value:.1f}"
+    return str(int(value))
+
+
+def format_complexity_report(report):
+    """Multi-line summary of an analysis report for the console."""
+    lines = [
+        f"Estimated worst case for '{report['title']}':",
+        f"  live entities: {_format_count(report['live_entities'])}, live projectiles: {_format_count(report['live_projectiles'])}",
+        f"  collision pairs per tick: {_format_count(report['collision_pairs'])}",
+        f"  draw calls per frame: {_format_count(report['draw_calls'])}, overdraw: {_format_count(report['overdraw'])}x screen"
+    ]
+    lines.extend(f"  note: {note}" for note in report["notes"])
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Estimate the worst-case runtime cost of game schemas.")
+    parser.add_argument("json_files", nargs="+")
+    parser.add_argument("--budget", help="JSON file with budget overrides (see DEFAULT_PERFORMANCE_BUDGET).")
+    parser.add_argument("--sim_hz", type=int, default=DEFAULT_SIM_HZ)
+    args = parser.parse_args()
+    if args.sim_hz <= 0:
+        parser.error("--sim_hz must be a positive number of ticks per second.")
+
+    budget = load_performance_budget(args.budget) if args.budget else None
+    over_budget = 0
+    for json_path in args.json_files:
+        with open(json_path, 'r') as f:
+            game_schema = json.load(f)
+        error = find_schema_error(game_schema)
+        if error is not None:
+            print(f"Skipping {json_path}: invalid schema ({error.message})")
+            continue
+        report = analyze_schema_complexity(game_schema, args.sim_hz)
+        print(format_complexity_report(report))
+        violations = check_performance_budget(report, budget)
+        for violation in violations:
+            print(f"  OVER BUDGET: {violation}")
+        over_budget += bool(violations)
+    raise SystemExit(1 if over_budget else 0)
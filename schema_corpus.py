@@ -0,0 +1,202 @@
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import zlib
+
+import jsonschema
+
+from game_schema_validator import validate_game_schema
+from schema_compiler import compile_game_schema
+
+# Packed schema corpus: many validated game schemas in one file.
+#
+# Layout:
+#   header   magic, format version, reserved, game count
+#   index    one fixed-size entry per game: payload offset/length, payload CRC32,
+#            title offset/length
+#   data     titles (UTF-8) and payloads (compact UTF-8 JSON of the schema)
+#
+# The file is memory-mapped and only the index is read up front; a game's payload is
+# decoded the first time it is asked for. Payloads stay JSON on purpose: the C json
+# decoder is faster than any pure-Python binary decoder, and the saving that matters
+# is opening and reading one file instead of one per game.
+
+CORPUS_MAGIC = b"GWSC"
+CORPUS_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHI") # magic, version, reserved, game count
+_INDEX_ENTRY = struct.Struct("<QIIQI") # payload offset, payload length, payload crc32, title offset, title length
+
+
+def write_corpus(schemas, path):
+    """
+    Packs an iterable of game schema dicts into a corpus file at path.
+    The file is replaced atomically. Returns the number of games written.
+    """
+    titles = []
+    payloads = []
+    for schema in schemas:
+        titles.append(schema.get("game_title", "Untitled Game").encode("utf-8"))
+        payloads.append(json.dumps(schema, separators=(",", ":")).encode("utf-8"))
+
+    index = bytearray(_INDEX_ENTRY.size * len(payloads))
+    offset = _HEADER.size + len(index)
+    for number, (title, payload) in enumerate(zip(titles, payloads)):
+        title_offset = offset
+        offset += len(title)
+        _INDEX_ENTRY.pack_into(index, number * _INDEX_ENTRY.size, offset, len(payload), zlib.crc32(payload), title_offset, len(title))
+        offset += len(payload)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, 0, len(payloads)))
+        f.write(index)
+        for title, payload in zip(titles, payloads):
+            f.write(title)
+            f.write(payload)
+    os.replace(temp_path, path)
+    return len(payloads)
+
+
+class SchemaCorpus:
+    """
+    Read-only, memory-mapped view of a corpus file.
+    Schemas are decoded lazily with load_schema(i); compiled games are cached per index.
+    Raises ValueError if the file is not a corpus of a supported version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError(f"{path} is not a schema corpus.")
+        self._view = memoryview(self._map)
+        try:
+            magic, version, _, count = _HEADER.unpack_from(self._view, 0)
+        except struct.error:
+            magic, version, count = None, None, 0
+        if magic != CORPUS_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a schema corpus.")
+        if version != CORPUS_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported corpus version {version} (expected {CORPUS_VERSION}).")
+        if _HEADER.size + count * _INDEX_ENTRY.size > len(self._map):
+            self.close()
+            raise ValueError(f"Corpus {path} is truncated.")
+        self._count = count
+        self._compiled = {}
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+            self._map.close()
+        self._file.close()
+
+    def _entry(self, number):
+        if not 0 <= number < self._count:
+            raise IndexError(f"Corpus has {self._count} games, no game {number}.")
+        return _INDEX_ENTRY.unpack_from(self._view, _HEADER.size + number * _INDEX_ENTRY.size)
+
+    def title(self, number):
+        """Returns a game's title without decoding its schema."""
+        _, _, _, title_offset, title_length = self._entry(number)
+        return str(self._view[title_offset:title_offset + title_length], "utf-8")
+
+    def titles(self):
+        return [self.title(number) for number in range(self._count)]
+
+    def load_schema(self, number):
+        """Decodes and returns game number's schema dict. Raises ValueError if its data is corrupted."""
+        offset, length, checksum, _, _ = self._entry(number)
+        payload = self._view[offset:offset + length]
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            raise ValueError(f"Corpus entry {number} is corrupted.")
+        return json.loads(bytes(payload))
+
+    def load_game(self, number):
+        """Returns game number compiled into a CompiledGame, compiling it at most once."""
+        game = self._compiled.get(number)
+        if game is None:
+            game = self._compiled[number] = compile_game_schema(self.load_schema(number))
+        return game
+
+    def __iter__(self):
+        for number in range(self._count):
+            yield self.load_schema(number)
+
+
+def json_files_to_corpus(json_paths, corpus_path):
+    """
+    Packs JSON schema files into a corpus. Files that cannot be read or do not pass
+    validation are skipped with a message. Returns the number of games written.
+    """
+    schemas = []
+    for json_path in json_paths:
+        try:
+            with open(json_path, 'r') as f:
+                schema = json.load(f)
+            validate_game_schema(schema)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Skipping {json_path}: {e}")
+            continue
+        except jsonschema.exceptions.ValidationError as e:
+            print(f"Skipping {json_path}: invalid schema ({e.message})")
+            continue
+        schemas.append(schema)
+    return write_corpus(schemas, corpus_path)
+
+
+def corpus_to_json_files(corpus_path, output_dir):
+    """Writes every game of a corpus to output_dir as '<index>_<title>.json'. Returns the written paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    with SchemaCorpus(corpus_path) as corpus:
+        for number, schema in enumerate(corpus):
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", corpus.title(number)).strip("_").lower() or "game"
+            path = os.path.join(output_dir, f"{number:04d}_{slug}.json")
+            with open(path, 'w') as f:
+                json.dump(schema, f, indent=4)
+            paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pack game schema JSON files into a corpus, or unpack / list one.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack_parser = subparsers.add_parser("pack", help="Pack JSON schema files into a corpus file.")
+    pack_parser.add_argument("corpus", help="Corpus file to write.")
+    pack_parser.add_argument("json_files", nargs="+", help="Schema JSON files to pack.")
+    unpack_parser = subparsers.add_parser("unpack", help="Write every game of a corpus as a JSON file.")
+    unpack_parser.add_argument("corpus", help="Corpus file to read.")
+    unpack_parser.add_argument("output_dir", help="Directory for the JSON files.")
+    list_parser = subparsers.add_parser("list", help="List the games in a corpus.")
+    list_parser.add_argument("corpus", help="Corpus file to read.")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        count = json_files_to_corpus(args.json_files, args.corpus)
+        print(f"Packed {count} games into {args.corpus}")
+    elif args.command == "unpack":
+        paths = corpus_to_json_files(args.corpus, args.output_dir)
+        print(f"Wrote {len(paths)} schema files to {args.output_dir}")
+    else:
+        with SchemaCorpus(args.corpus) as corpus:
+            for number, title in enumerate(corpus.titles()):
+                print(f"{number}: {title}")
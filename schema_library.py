@@ -0,0 +1,326 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+
+import jsonschema
+
+from game_schema_validator import validate_game_schema
+from schema_compiler import compile_game_schema
+
+# Local catalog of validated game schemas, kept in a SQLite file. Each schema is
+# stored once (deduplicated by a hash of its canonical JSON) next to the features
+# queries filter on: entity counts per type (including what spawners can have alive),
+# movement patterns, shooters, health.
+# Queries only touch the indexed feature tables; no schema JSON is parsed.
+
+DEFAULT_LIBRARY_PATH = "schema_library.db"
+
+_TABLES = """
+CREATE TABLE IF NOT EXISTS schemas (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    source TEXT,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    entity_count INTEGER NOT NULL,
+    spawner_count INTEGER NOT NULL,
+    has_player INTEGER NOT NULL,
+    player_can_shoot INTEGER NOT NULL,
+    has_shooter INTEGER NOT NULL,
+    has_health INTEGER NOT NULL,
+    added_at REAL NOT NULL,
+    schema_json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entity_type_counts (
+    schema_id INTEGER NOT NULL REFERENCES schemas(id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (schema_id, type)
+);
+CREATE TABLE IF NOT EXISTS movement_patterns (
+    schema_id INTEGER NOT NULL REFERENCES schemas(id) ON DELETE CASCADE,
+    pattern TEXT NOT NULL,
+    PRIMARY KEY (schema_id, pattern)
+);
+CREATE INDEX IF NOT EXISTS idx_entity_type_counts ON entity_type_counts (type, count);
+CREATE INDEX IF NOT EXISTS idx_movement_patterns ON movement_patterns (pattern);
+CREATE INDEX IF NOT EXISTS idx_schemas_title ON schemas (title);
+CREATE INDEX IF NOT EXISTS idx_schemas_features ON schemas (has_shooter, player_can_shoot, has_health);
+"""
+
+
+def schema_content_hash(game_schema):
+    """SHA-256 of the schema's canonical JSON (sorted keys, no whitespace), so formatting doesn't matter."""
+    canonical = json.dumps(game_schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def spawner_population(spawner):
+    """Most entities a compiled spawner can have alive at once: max_alive, or fewer if it spawns fewer in total."""
+    total_spawns = sum(wave.count for wave in spawner.waves)
+    if spawner.interval_ms:
+        if spawner.end_ms is None:
+            return spawner.max_alive
+        total_spawns += max(0, (spawner.end_ms - spawner.start_ms) // spawner.interval_ms + 1)
+    return min(spawner.max_alive, total_spawns)
+
+
+def extract_features(game_schema):
+    """
+    Computes the indexed features of a schema from its compiled form, so defaults are already applied.
+    Type counts include each spawner's archetype, weighted by spawner_population().
+    """
+    game = compile_game_schema(game_schema)
+    type_counts = {}
+    patterns = set()
+    for entity in game.entities:
+        type_counts[entity.type] = type_counts.get(entity.type, 0) + 1
+        patterns.add(entity.movement_pattern)
+    for spawner in game.spawners:
+        archetype_type = spawner.archetype.type
+        type_counts[archetype_type] = type_counts.get(archetype_type, 0) + spawner_population(spawner)
+        patterns.add(spawner.archetype.movement_pattern)
+    entities = game.entities + tuple(spawner.archetype for spawner in game.spawners)
+    player = game.entities[game.player_index] if game.player_index is not None else None
+    return {
+        "title": game.title,
+        "width": game.width,
+        "height": game.height,
+        "entity_count": len(game.entities),
+        "spawner_count": len(game.spawners),
+        "has_player": player is not None,
+        "player_can_shoot": player is not None and player.can_shoot and player.projectile_archetype is not None,
+        "has_shooter": any(entity.can_shoot and entity.projectile_archetype is not None for entity in entities),
+        "has_health": any(entity.health_points is not None for entity in entities),
+        "type_counts": type_counts,
+        "patterns": sorted(patterns)
+    }
+
+
+class SchemaLibrary:
+    """
+    Indexed schema catalog backed by a SQLite file.
+    Use add() / add_files() to ingest schemas and query() to search them.
+    """
+
+    def __init__(self, path=DEFAULT_LIBRARY_PATH):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.executescript(_TABLES)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM schemas").fetchone()[0]
+
+    def add(self, game_schema, source=None):
+        """
+        Validates and ingests a schema. Returns (schema_id, added), where added is False
+        if an identical schema was already in the library.
+        Raises jsonschema.exceptions.ValidationError for invalid schemas.
+        """
+        validate_game_schema(game_schema)
+        content_hash = schema_content_hash(game_schema)
+        row = self._db.execute("SELECT id FROM schemas WHERE content_hash = ?", (content_hash,)).fetchone()
+        if row is not None:
+            return row["id"], False
+
+        features = extract_features(game_schema)
+        with self._db:
+            cursor = self._db.execute(
+                "INSERT INTO schemas (content_hash, title, source, width, height, entity_count, spawner_count,"
+                " has_player, player_can_shoot, has_shooter, has_health, added_at, schema_json)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    content_hash, features["title"], source, features["width"], features["height"],
+                    features["entity_count"], features["spawner_count"], features["has_player"],
+                    features["player_can_shoot"], features["has_shooter"], features["has_health"],
+                    time.time(), json.dumps(game_schema, separators=(",", ":"))
+                )
+            )
+            schema_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO entity_type_counts (schema_id, type, count) VALUES (?, ?, ?)",
+                [(schema_id, entity_type, count) for entity_type, count in features["type_counts"].items()]
+            )
+            self._db.executemany(
+                "INSERT INTO movement_patterns (schema_id, pattern) VALUES (?, ?)",
+                [(schema_id, pattern) for pattern in features["patterns"]]
+            )
+        return schema_id, True
+
+    def add_files(self, json_paths):
+        """Ingests JSON schema files, skipping unreadable or invalid ones with a message. Returns the number added."""
+        added_count = 0
+        for json_path in json_paths:
+            try:
+                with open(json_path, 'r') as f:
+                    game_schema = json.load(f)
+                _, added = self.add(game_schema, source=json_path)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Skipping {json_path}: {e}")
+                continue
+            except jsonschema.exceptions.ValidationError as e:
+                print(f"Skipping {json_path}: invalid schema ({e.message})")
+                continue
+            if added:
+                added_count += 1
+            else:
+                print(f"Skipping {json_path}: already in the library.")
+        return added_count
+
+    def remove(self, schema_id):
+        with self._db:
+            self._db.execute("DELETE FROM schemas WHERE id = ?", (schema_id,))
+
+    def get_schema(self, schema_id):
+        """Returns the stored schema dict, or None if there is no such id."""
+        row = self._db.execute("SELECT schema_json FROM schemas WHERE id = ?", (schema_id,)).fetchone()
+        return json.loads(row["schema_json"]) if row is not None else None
+
+    def query(self, title=None, min_counts=None, max_counts=None, patterns=None,
+              shooter=None, player_shooter=None, health=None, limit=None):
+        """
+        Returns matching schemas as dicts of their indexed features (not the schema itself).
+        title: case-insensitive substring. min_counts / max_counts: {entity type: count},
+        inclusive bounds (a type missing from a schema counts as 0). patterns: movement
+        patterns that must all be used. shooter / player_shooter / health: True or False
+        to require or exclude the feature, None to ignore it.
+        """
+        conditions = []
+        params = []
+        if title:
+            conditions.append("title LIKE ?")
+            params.append(f"%{title}%")
+        for column, value in (("has_shooter", shooter), ("player_can_shoot", player_shooter), ("has_health", health)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(bool(value))
+        type_count = "COALESCE((SELECT count FROM entity_type_counts WHERE schema_id = schemas.id AND type = ?), 0)"
+        for entity_type, count in (min_counts or {}).items():
+            conditions.append(f"{type_count} >= ?")
+            params.extend((entity_type, count))
+        for entity_type, count in (max_counts or {}).items():
+            conditions.append(f"{type_count} <= ?")
+            params.extend((entity_type, count))
+        for pattern in patterns or ():
+            conditions.append("EXISTS (SELECT 1 FROM movement_patterns WHERE schema_id = schemas.id AND pattern = ?)")
+            params.append(pattern)
+
+        sql = (
+            "SELECT id, title, source, width, height, entity_count, spawner_count, has_player,"
+            " player_can_shoot, has_shooter, has_health, content_hash FROM schemas"
+        )
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        results = [dict(row) for row in self._db.execute(sql, params)]
+        for result in results:
+            result["type_counts"] = {
+                row["type"]: row["count"]
+                for row in self._db.execute("SELECT type, count FROM entity_type_counts WHERE schema_id = ?", (result["id"],))
+            }
+        return results
+
+
+def _type_count(value):
+    """argparse type for 'type=count' pairs, e.g. 'enemy=50' -> ('enemy', 50)."""
+    entity_type, separator, count = value.partition("=")
+    if not separator or not entity_type:
+        raise argparse.ArgumentTypeError(f"expected TYPE=COUNT, got '{value}'")
+    try:
+        count = int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"count in '{value}' is not an integer")
+    if count < 0:
+        raise argparse.ArgumentTypeError(f"count in '{value}' is negative")
+    return entity_type, count
+
+
+def run_self_check():
+    """Built-in checks against an in-memory library. Raises AssertionError on failure."""
+    spawner_only = {
+        "game_title": "Spawned Swarm",
+        "screen_dimensions": {"width": 800, "height": 600},
+        "entities": [],
+        "spawners": [
+            {"id": "wave", "entity_archetype": {"type": "enemy", "color": [200, 0, 0], "size": {"width": 20, "height": 20}},
+             "waves": [{"at_ms": 0, "count": 60}]},
+            {"id": "stream", "entity_archetype": {"type": "obstacle", "color": [90, 90, 90], "size": {"radius": 8}},
+             "interval_ms": 500, "max_alive": 30}
+        ]
+    }
+    with SchemaLibrary(":memory:") as library:
+        schema_id, _ = library.add(spawner_only)
+        assert [result["id"] for result in library.query(min_counts={"enemy": 51})] == [schema_id]
+        assert library.query(max_counts={"enemy": 0}) == []
+        assert library.query()[0]["type_counts"] == {"enemy": 60, "obstacle": 30}
+    print("Schema library self-check passed.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Indexed library of validated game schemas.")
+    parser.add_argument("--db", default=DEFAULT_LIBRARY_PATH, help="Library database file.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_parser = subparsers.add_parser("add", help="Validate and add schema JSON files.")
+    add_parser.add_argument("json_files", nargs="+")
+    query_parser = subparsers.add_parser("query", help="Search the library, e.g.: query --shooter --min enemy=51")
+    query_parser.add_argument("--title", help="Substring of the game title.")
+    query_parser.add_argument("--min", nargs="*", type=_type_count, metavar="TYPE=COUNT", help="Minimum entity count per type.")
+    query_parser.add_argument("--max", nargs="*", type=_type_count, metavar="TYPE=COUNT", help="Maximum entity count per type.")
+    query_parser.add_argument("--pattern", nargs="*", help="Movement patterns that must be used.")
+    query_parser.add_argument("--shooter", action="store_true", help="Only games where some entity can shoot.")
+    query_parser.add_argument("--player_shooter", action="store_true", help="Only games where the player can shoot.")
+    query_parser.add_argument("--health", action="store_true", help="Only games that use health_points.")
+    query_parser.add_argument("--limit", type=int)
+    show_parser = subparsers.add_parser("show", help="Print a stored schema as JSON.")
+    show_parser.add_argument("schema_id", type=int)
+    subparsers.add_parser("check", help="Run the built-in self-check (in memory, --db is not touched).")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        run_self_check()
+        raise SystemExit(0)
+
+    with SchemaLibrary(args.db) as library:
+        if args.command == "add":
+            added_count = library.add_files(args.json_files)
+            print(f"Added {added_count} schemas ({len(library)} in library).")
+        elif args.command == "query":
+            start = time.perf_counter()
+            results = library.query(
+                title=args.title,
+                min_counts=dict(args.min or ()),
+                max_counts=dict(args.max or ()),
+                patterns=args.pattern,
+                shooter=True if args.shooter else None,
+                player_shooter=True if args.player_shooter else None,
+                health=True if args.health else None,
+                limit=args.limit
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            for result in results:
+                counts = ", ".join(f"{entity_type}={count}" for entity_type, count in sorted(result["type_counts"].items()))
+                print(f"{result['id']}: {result['title']} [{counts}] {result['source'] or ''}")
+            print(f"{len(results)} matches in {elapsed_ms:.1f} ms.")
+        else:
+            game_schema = library.get_schema(args.schema_id)
+            if game_schema is None:
+                print(f"No schema with id {args.schema_id}.")
+            else:
+                print(json.dumps(game_schema, indent=4))
@@ -0,0 +1,324 @@
+import asyncio
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from game_schema_validator import find_schema_error, get_game_schema_validator
+from generation_batcher import PromptBatcher
+from hud import HudCompositor, load_hud_font
+from renderer import draw_initial_frame
+from schema_compiler import compile_game_schema
+from schema_complexity import BudgetExceededError, enforce_performance_budget
+
+# Long-running local HTTP service (asyncio, standard library only):
+#   POST /generate  {"prompt": "..."}  -> {"schema": {...}, "cached": bool}
+#   POST /validate  {"schema": {...}}  -> {"valid": bool, "error": "...", "path": [...]}
+#   POST /render    {"schema": {...}}  -> image/png thumbnail (the single-frame view); schemas
+#                                         over the performance budget, if one is set, get 400
+#   GET  /metrics                      -> request counts and latency percentiles per endpoint
+#   GET  /health
+# The compiled validator, the generation backend (behind a PromptBatcher, so concurrent
+# /generate requests share model calls) and an initialized pygame renderer stay resident.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_CONCURRENCY = 8
+MAX_PENDING_PER_SLOT = 4 # Requests allowed to wait per concurrency slot before answering 503
+MAX_BODY_BYTES = 1024 * 1024
+MAX_RENDER_PIXELS = 4096 * 4096
+LATENCY_WINDOW = 1024 # Recent requests kept per endpoint for percentiles
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+            500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+
+class RequestError(Exception):
+    """Raised by endpoint handlers to answer with an HTTP error status and message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyMetrics:
+    """Per-endpoint request counters and a rolling window of latencies."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._endpoints = {}
+
+    def record(self, endpoint, duration_s, status):
+        entry = self._endpoints.get(endpoint)
+        if entry is None:
+            entry = self._endpoints[endpoint] = {"count": 0, "errors": 0, "latencies": deque(maxlen=self.window)}
+        entry["count"] += 1
+        if status >= 400:
+            entry["errors"] += 1
+        entry["latencies"].append(duration_s)
+
+    def snapshot(self):
+        result = {}
+        for endpoint, entry in self._endpoints.items():
+            latencies = sorted(entry["latencies"])
+            def percentile(fraction):
+                return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 3) if latencies else None
+            result[endpoint] = {
+                "count": entry["count"],
+                "errors": entry["errors"],
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "max_ms": round(latencies[-1] * 1000, 3) if latencies else None
+            }
+        return result
+
+
+class ThumbnailRenderer:
+    """
+    Warm pygame state for /render. pygame is initialized once and frame surfaces are
+    reused per screen size. Not thread-safe: the server calls it from a single worker thread.
+    """
+
+    MAX_CACHED_SURFACES = 8
+
+    def __init__(self):
+        pygame.init()
+        self.hud = HudCompositor(load_hud_font()) # Rule surfaces are cached across requests for the same rules
+        self._surfaces = {}
+
+    def render_png(self, game):
+        size = (game.width, game.height)
+        surface = self._surfaces.get(size)
+        if surface is None:
+            if len(self._surfaces) >= self.MAX_CACHED_SURFACES:
+                self._surfaces.clear()
+            surface = self._surfaces[size] = pygame.Surface(size)
+        draw_initial_frame(surface, game, self.hud)
+        buffer = io.BytesIO()
+        pygame.image.save(surface, buffer, "frame.png")
+        return buffer.getvalue()
+
+    def close(self):
+        pygame.quit()
+
+
+def _validate_quietly(schema):
+    """validate_game_schema() without the console messages, for the generation batcher."""
+    error = find_schema_error(schema)
+    if error is not None:
+        raise error
+
+
+def _json_response(status, data):
+    return status, "application/json", json.dumps(data).encode("utf-8")
+
+
+def _schema_from_body(data):
+    schema = data.get("schema") if isinstance(data, dict) else None
+    if not isinstance(schema, dict):
+        raise RequestError(400, "Request body must be a JSON object with a \"schema\" object.")
+    return schema
+
+
+class SchemaServer:
+    """
+    HTTP front end for schema generation, validation and thumbnail rendering.
+    At most max_concurrency POST requests are processed at once; further requests
+    wait, and once MAX_PENDING_PER_SLOT * max_concurrency are waiting, new ones get 503.
+    """
+
+    def __init__(self, backend, host=DEFAULT_HOST, port=DEFAULT_PORT, max_concurrency=DEFAULT_MAX_CONCURRENCY, prompt_cache=None,
+                 performance_budget=None):
+        self.backend = backend
+        self.host = host
+        self.port = port
+        assert max_concurrency >= 1, "max_concurrency must be at least 1"
+        self.max_concurrency = max_concurrency
+        self.prompt_cache = prompt_cache
+        self.performance_budget = performance_budget # None: /render does not check the budget
+        self.metrics = LatencyMetrics()
+        self.started_at = time.time()
+        self.in_flight = 0
+        self._waiting = 0
+        self._semaphore = None # Created inside the running event loop
+        get_game_schema_validator() # Build the validator now rather than on the first request
+        self._batcher = PromptBatcher(backend, validate=_validate_quietly)
+        self._render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnail-render")
+        self._renderer = self._render_executor.submit(ThumbnailRenderer).result() # pygame lives on the render thread
+        self._routes = {
+            "/generate": ("POST", self._generate),
+            "/validate": ("POST", self._validate),
+            "/render": ("POST", self._render),
+            "/metrics": ("GET", self._metrics),
+            "/health": ("GET", self._health)
+        }
+
+    async def _generate(self, data):
+        prompt = data.get("prompt") if isinstance(data, dict) else None
+        if not isinstance(prompt, str) or not prompt.strip():
+            raise RequestError(400, "Request body must be a JSON object with a non-empty \"prompt\".")
+        if self.prompt_cache is not None:
+            cached = self.prompt_cache.lookup(prompt)
+            if cached is not None:
+                schema, similarity, _ = cached
+                return _json_response(200, {"schema": schema, "cached": True, "similarity": round(similarity, 3)})
+        schema = await asyncio.wrap_future(self._batcher.submit(prompt))
+        if schema is None:
+            raise RequestError(502, f"Backend '{self.backend.name}' did not produce a valid schema.")
+        if self.prompt_cache is not None:
+            self.prompt_cache.add(prompt, schema)
+        return _json_response(200, {"schema": schema, "cached": False})
+
+    async def _validate(self, data):
+        error = find_schema_error(_schema_from_body(data))
+        if error is None:
+            return _json_response(200, {"valid": True})
+        return _json_response(200, {"valid": False, "error": error.message, "path": list(error.absolute_path)})
+
+    async def _render(self, data):
+        schema = _schema_from_body(data)
+        error = find_schema_error(schema)
+        if error is not None:
+            raise RequestError(400, f"Invalid schema: {error.message}")
+        if self.performance_budget is not None:
+            try:
+                enforce_performance_budget(schema, self.performance_budget)
+            except BudgetExceededError as e:
+                raise RequestError(400, f"Schema exceeds the performance budget: {e}")
+        game = compile_game_schema(schema)
+        if game.width * game.height > MAX_RENDER_PIXELS:
+            raise RequestError(400, f"Screen of {game.width}x{game.height} is too large to render.")
+        png = await asyncio.get_running_loop().run_in_executor(self._render_executor, self._renderer.render_png, game)
+        return 200, "image/png", png
+
+    async def _metrics(self, data):
+        return _json_response(200, {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "in_flight": self.in_flight,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "endpoints": self.metrics.snapshot(),
+            "batcher": dict(self._batcher.stats)
+        })
+
+    async def _health(self, data):
+        return _json_response(200, {"status": "ok", "backend": self.backend.name})
+
+    async def _dispatch(self, method, path, body):
+        route = self._routes.get(path.split("?", 1)[0])
+        if route is None:
+            raise RequestError(404, f"No endpoint {path}.")
+        route_method, handler = route
+        if method != route_method:
+            raise RequestError(405, f"{path} expects {route_method}.")
+        if method == "GET":
+            return await handler(None)
+        try:
+            data = json.loads(body or b"null")
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise RequestError(400, f"Invalid JSON body: {e}")
+
+        if self._waiting >= MAX_PENDING_PER_SLOT * self.max_concurrency:
+            raise RequestError(503, "Server busy, try again later.")
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self.in_flight += 1
+        try:
+            return await handler(data)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def _respond(self, method, path, body):
+        start = time.perf_counter()
+        try:
+            status, content_type, payload = await self._dispatch(method, path, body)
+        except RequestError as e:
+            status, content_type, payload = _json_response(e.status, {"error": str(e)})
+        except Exception as e:
+            print(f"Error: Unhandled error on {method} {path}: {e}")
+            status, content_type, payload = _json_response(500, {"error": "Internal server error."})
+        endpoint = path.split("?", 1)[0]
+        self.metrics.record(endpoint if endpoint in self._routes else "(unknown)", time.perf_counter() - start, status)
+        return status, content_type, payload
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                content_length = int(headers.get("content-length", 0) or 0)
+                if content_length > MAX_BODY_BYTES:
+                    status, content_type, payload = _json_response(413, {"error": f"Body larger than {MAX_BODY_BYTES} bytes."})
+                    keep_alive = False # The unread body would be taken for the next request
+                else:
+                    body = await reader.readexactly(content_length) if content_length else b""
+                    status, content_type, payload = await self._respond(method, path, body)
+
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass # Client went away or sent a malformed request; drop the connection
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve_forever(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        print(f"Schema server listening on http://{self.host}:{self.port} (backend: {self.backend.name})")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self._batcher.close()
+        self._render_executor.submit(self._renderer.close).result()
+        self._render_executor.shutdown()
+        if self.prompt_cache is not None:
+            self.prompt_cache.save()
+
+
+def run_server(backend, host=DEFAULT_HOST, port=DEFAULT_PORT, max_concurrency=DEFAULT_MAX_CONCURRENCY, prompt_cache=None,
+               performance_budget=None):
+    """Runs the schema server until interrupted (Ctrl+C)."""
+    if os.environ.get('SDL_VIDEODRIVER') is None:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy' # Thumbnails are rendered offscreen
+    server = SchemaServer(backend, host, port, max_concurrency, prompt_cache, performance_budget)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Shutting down schema server.")
+    finally:
+        server.close()
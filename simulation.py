@@ -0,0 +1,472 @@
+import heapq
+import random
+
+import pygame
+
+from events import EventBus, CollisionEvent, DamageEvent, DestroyedEvent, SpawnedEvent, ExpiredEvent
+from collision import broad_phase_pairs, narrow_phase, swept_broad_phase_pairs, swept_narrow_phase
+
+# Schema speeds were authored against the original 30 FPS loop (pixels per frame).
+# The simulation works in pixels per second, so existing schemas keep their feel.
+SCHEMA_SPEED_FRAME_RATE = 30
+DEFAULT_SIM_HZ = 60
+
+NO_CONTROLS = {"left": False, "right": False, "up": False, "down": False, "fire": False}
+
+
+def scripted_controls(sim_hz, sweep_seconds=2):
+    """
+    Input script for unattended runs (soak tests, preview capture): fire is held and
+    the player sweeps left, then right, sweep_seconds each way. Returns controls_at(tick).
+    """
+    sweep_left = dict(NO_CONTROLS, left=True, fire=True)
+    sweep_right = dict(NO_CONTROLS, right=True, fire=True)
+    sweep_ticks = max(1, round(sweep_seconds * sim_hz))
+    return lambda tick: sweep_left if (tick // sweep_ticks) % 2 == 0 else sweep_right
+
+
+def init_entity_state(entity, compiled_entity, x, y):
+    """(Re)initializes an entity dict in place, reusing its Rect if it already has one."""
+    rect = entity.get("rect")
+    if rect is None:
+        rect = pygame.Rect(x, y, compiled_entity.width, compiled_entity.height)
+    else:
+        rect.update(x, y, compiled_entity.width, compiled_entity.height)
+    entity.update({
+        "spec": compiled_entity,
+        "id": compiled_entity.id,
+        "name": compiled_entity.name,
+        "type": compiled_entity.type,
+        "shape": compiled_entity.shape,
+        "color_tuple": compiled_entity.color,
+        "radius": compiled_entity.radius,
+        # Float position is the simulation truth; rect is kept in sync for collisions.
+        "x": float(x),
+        "y": float(y),
+        "prev_x": float(x),
+        "prev_y": float(y),
+        "rect": rect,
+        "is_controllable": compiled_entity.is_controllable,
+        "movement_pattern": compiled_entity.movement_pattern,
+        "speed": compiled_entity.speed * SCHEMA_SPEED_FRAME_RATE, # pixels per second
+        "health_points": compiled_entity.health_points,
+        "can_shoot": compiled_entity.can_shoot,
+        "projectile_archetype": compiled_entity.projectile_archetype,
+        "last_shot_time": None,
+        "spawner_index": None, # Set for entities owned by a spawner (returned to its pool on removal)
+        "spawn_number": None,
+        "patrol_direction": 1 if compiled_entity.movement_pattern == "moving_left_right_patrol" else 0 # 1 for right, -1 for left
+    })
+    return entity
+
+
+def create_entity_state(compiled_entity):
+    """Builds the mutable runtime dict for an entity from its CompiledEntity description."""
+    return init_entity_state({}, compiled_entity, compiled_entity.x, compiled_entity.y)
+
+
+def team_of(entity):
+    """Projectiles only hit entities of other teams: the player's side vs. everything else."""
+    return "player" if entity["type"] == "player" else "hostile"
+
+
+def init_projectile_state(archetype, projectile_number, x, y, vx, vy, owner_id, team, expires_at_ms):
+    """Builds the runtime dict for a projectile at (x, y) moving at (vx, vy) pixels per second."""
+    return {
+        "id": f"{archetype.id_prefix}{projectile_number}",
+        "name": f"{archetype.name_prefix}{projectile_number}",
+        "number": projectile_number,
+        "archetype": archetype,
+        "type": archetype.type,
+        "shape": archetype.shape,
+        "color_tuple": archetype.color,
+        "radius": archetype.radius,
+        "x": x,
+        "y": y,
+        "prev_x": x,
+        "prev_y": y,
+        "rect": pygame.Rect(round(x), round(y), archetype.width, archetype.height),
+        "vx": vx,
+        "vy": vy,
+        "owner_id": owner_id,
+        "team": team,
+        "damage": archetype.damage,
+        "expires_at_ms": expires_at_ms,
+        "health_points": None,
+        "spawner_index": None,
+        "is_controllable": False
+    }
+
+
+def create_projectile_state(archetype, projectile_number, shooter, now_ms, direction):
+    """
+    Builds the runtime dict for a projectile fired by shooter along the unit vector direction.
+    The projectile starts just outside the shooter's box on the side it is fired towards.
+    """
+    shooter_rect = shooter["rect"]
+    dir_x, dir_y = direction
+    center_x = shooter_rect.centerx + dir_x * (shooter_rect.width + archetype.width) / 2
+    center_y = shooter_rect.centery + dir_y * (shooter_rect.height + archetype.height) / 2
+    speed = archetype.speed * SCHEMA_SPEED_FRAME_RATE # pixels per second
+    return init_projectile_state(
+        archetype,
+        projectile_number,
+        center_x - archetype.width / 2,
+        center_y - archetype.height / 2,
+        dir_x * speed,
+        dir_y * speed,
+        shooter["id"],
+        team_of(shooter),
+        now_ms + archetype.lifespan_ms if archetype.lifespan_ms else None
+    )
+
+
+def _create_spawning_state(game):
+    """
+    Spawner bookkeeping. Scheduled spawns live in a heap of
+    (due_ms, sequence, spawner_index, remaining, spacing_ms) entries, where remaining
+    is None for a spawner's continuous interval and the number of spawns left for a wave.
+    Each tick only pops the entries that are due, so cost does not grow with the
+    number of spawners or scheduled waves.
+    """
+    queue = []
+    sequence = 0
+    for index, spawner in enumerate(game.spawners):
+        if spawner.interval_ms:
+            queue.append((spawner.start_ms, sequence, index, None, spawner.interval_ms))
+            sequence += 1
+        for wave in spawner.waves:
+            queue.append((wave.at_ms, sequence, index, wave.count, wave.spacing_ms))
+            sequence += 1
+    heapq.heapify(queue)
+    return {
+        "queue": queue,
+        "sequence": sequence,
+        "alive": [0] * len(game.spawners),
+        "spawned": [0] * len(game.spawners),
+        "pools": [[] for _ in game.spawners] # Released entity dicts, reused on the next spawn
+    }
+
+
+def create_world(game, seed=None):
+    """
+    Creates the mutable world state for a CompiledGame.
+    The world is a plain dict so that the renderer, headless tools and
+    serializers can all work on the same structure. Game events (collisions,
+    damage, spawns, ...) are published on world["events"].
+    """
+    entities = [create_entity_state(compiled_entity) for compiled_entity in game.entities]
+    return {
+        "game": game,
+        "entities": entities,
+        "projectiles": [], # Kept apart from entities so they can be moved in one batched pass
+        "player": entities[game.player_index] if game.player_index is not None else None,
+        "projectile_id_counter": 0,
+        "time_ms": 0.0,
+        "tick": 0,
+        "rng": random.Random(seed),
+        "events": EventBus(),
+        "spawning": _create_spawning_state(game)
+    }
+
+
+def _move_to(entity, x, y):
+    entity["x"] = x
+    entity["y"] = y
+    entity["rect"].x = round(x)
+    entity["rect"].y = round(y)
+
+
+def _teleport(entity, x, y):
+    """Moves an entity without interpolating from its previous position (e.g. wrap-around resets)."""
+    _move_to(entity, x, y)
+    entity["prev_x"] = entity["x"]
+    entity["prev_y"] = entity["y"]
+
+
+def _spawn_from(world, spawner_index):
+    """Spawns one entity from a spawner, reusing a pooled entity dict when available."""
+    spawning = world["spawning"]
+    spawner = world["game"].spawners[spawner_index]
+    if spawning["alive"][spawner_index] >= spawner.max_alive:
+        return None # At the cap: skip this spawn rather than queue it
+
+    archetype = spawner.archetype
+    right_limit = max(spawner.x_min, spawner.x_max - archetype.width)
+    x = world["rng"].randint(spawner.x_min, right_limit)
+    pool = spawning["pools"][spawner_index]
+    entity = init_entity_state(pool.pop() if pool else {}, archetype, x, spawner.y)
+
+    spawning["spawned"][spawner_index] += 1
+    spawning["alive"][spawner_index] += 1
+    number = spawning["spawned"][spawner_index]
+    entity["id"] = f"{spawner.id_prefix}{number}"
+    entity["name"] = f"{spawner.name_prefix}{number}"
+    entity["spawner_index"] = spawner_index
+    entity["spawn_number"] = number
+    world["entities"].append(entity)
+    world["events"].publish(SpawnedEvent(world["tick"], entity["name"], entity["type"]))
+    return entity
+
+
+def _release_spawned(world, entity):
+    """Returns a spawner-owned entity to its spawner's pool once it leaves the world."""
+    spawning = world["spawning"]
+    spawner_index = entity["spawner_index"]
+    spawning["alive"][spawner_index] -= 1
+    spawning["pools"][spawner_index].append(entity)
+
+
+def _run_spawners(world):
+    """Pops and executes every scheduled spawn that is due at the current simulation time."""
+    spawning = world["spawning"]
+    queue = spawning["queue"]
+    now = world["time_ms"]
+    spawners = world["game"].spawners
+    while queue and queue[0][0] <= now:
+        due_ms, _, spawner_index, remaining, spacing_ms = heapq.heappop(queue)
+        spawner = spawners[spawner_index]
+        if spawner.end_ms is not None and due_ms > spawner.end_ms:
+            continue # Past the spawner's end: drop the entry without rescheduling
+        _spawn_from(world, spawner_index)
+
+        # Continuous entries repeat forever; wave entries count down to their last spawn
+        if remaining is None or remaining > 1:
+            heapq.heappush(queue, (
+                due_ms + spacing_ms,
+                spawning["sequence"],
+                spawner_index,
+                None if remaining is None else remaining - 1,
+                spacing_ms
+            ))
+            spawning["sequence"] += 1
+
+
+def _fire_direction(world, shooter, archetype):
+    if archetype.aim_at_player and world["player"] is not None and shooter is not world["player"]:
+        target = world["player"]["rect"]
+        dx = target.centerx - shooter["rect"].centerx
+        dy = target.centery - shooter["rect"].centery
+        length = (dx * dx + dy * dy) ** 0.5
+        if length > 0:
+            return dx / length, dy / length
+    if archetype.direction is not None:
+        return archetype.direction
+    return (0.0, -1.0) if team_of(shooter) == "player" else (0.0, 1.0) # Player fires up, others down
+
+
+def _try_fire(world, shooter):
+    """Fires one projectile from shooter's projectile_archetype if its cooldown has elapsed."""
+    archetype = shooter["projectile_archetype"]
+    if not shooter["can_shoot"] or archetype is None:
+        return None
+    now = world["time_ms"]
+    last_shot_time = shooter["last_shot_time"]
+    if last_shot_time is not None and now - last_shot_time <= archetype.cooldown_ms:
+        return None
+    shooter["last_shot_time"] = now
+    world["projectile_id_counter"] += 1
+    projectile = create_projectile_state(archetype, world["projectile_id_counter"], shooter, now, _fire_direction(world, shooter, archetype))
+    world["projectiles"].append(projectile)
+    world["events"].publish(SpawnedEvent(world["tick"], projectile["name"], projectile["type"]))
+    return projectile
+
+
+def _update_projectiles(world, dt):
+    """
+    Moves every live projectile along its own velocity vector in one pass, then drops
+    the ones that expired or left the screen. No per-projectile pattern dispatch.
+    """
+    game = world["game"]
+    now = world["time_ms"]
+    events = world["events"]
+    tick = world["tick"]
+    width = game.width
+    height = game.height
+    survivors = []
+    for projectile in world["projectiles"]:
+        x = projectile["x"]
+        y = projectile["y"]
+        projectile["prev_x"] = x
+        projectile["prev_y"] = y
+        x += projectile["vx"] * dt
+        y += projectile["vy"] * dt
+        projectile["x"] = x
+        projectile["y"] = y
+        rect = projectile["rect"]
+        rect.x = round(x)
+        rect.y = round(y)
+        expires_at_ms = projectile["expires_at_ms"]
+        if expires_at_ms is not None and now > expires_at_ms:
+            events.publish(ExpiredEvent(tick, projectile["name"], "lifespan"))
+        elif rect.bottom < 0 or rect.top > height or rect.right < 0 or rect.left > width:
+            events.publish(ExpiredEvent(tick, projectile["name"], "offscreen"))
+        else:
+            survivors.append(projectile)
+    world["projectiles"] = survivors
+
+
+def _update_player(world, player, dt, controls):
+    game = world["game"]
+    pattern = player["movement_pattern"]
+    step = player["speed"] * dt
+    dx = dy = 0.0
+    if controls["left"]:
+        dx -= step
+    if controls["right"]:
+        dx += step
+    if pattern == "player_omni_directional_control":
+        if controls["up"]:
+            dy -= step
+        if controls["down"]:
+            dy += step
+
+    # Keep player within screen bounds
+    rect = player["rect"]
+    x = min(max(player["x"] + dx, 0), game.width - rect.width)
+    y = player["y"] + dy
+    if pattern == "player_omni_directional_control":
+        y = min(max(y, 0), game.height - rect.height)
+    _move_to(player, x, y)
+
+    # Shooting (if player can shoot)
+    if controls["fire"]:
+        _try_fire(world, player)
+
+
+def _update_entities(world, dt):
+    """Moves non-player entities, lets non-player shooters fire, and returns entities that left the world."""
+    game = world["game"]
+    events = world["events"]
+    expired = []
+    for entity in world["entities"]:
+        pattern = entity["movement_pattern"]
+        if pattern == "falling_down":
+            _move_to(entity, entity["x"], entity["y"] + entity["speed"] * dt)
+            if entity["rect"].top > game.height: # If entity is past the bottom edge
+                if entity["spawner_index"] is not None:
+                    # Spawned entities leave the world and go back to their spawner's pool
+                    expired.append(entity)
+                    events.publish(ExpiredEvent(world["tick"], entity["name"], "offscreen"))
+                    continue
+                # Reset to top, above screen, with a random x if it fits on screen
+                width = entity["rect"].width
+                new_x = world["rng"].randint(0, game.width - width) if width < game.width else 0
+                _teleport(entity, new_x, -entity["rect"].height)
+        elif pattern == "moving_left_right_patrol":
+            x = entity["x"] + entity["speed"] * entity["patrol_direction"] * dt
+            if x < 0:
+                x = 0
+                entity["patrol_direction"] = 1 # Change direction to right
+            elif x + entity["rect"].width > game.width:
+                x = game.width - entity["rect"].width
+                entity["patrol_direction"] = -1 # Change direction to left
+            _move_to(entity, x, entity["y"])
+        elif pattern == "projectile_movement": # Schema entities using the projectile pattern move upwards
+            _move_to(entity, entity["x"], entity["y"] - entity["speed"] * dt)
+            if entity["rect"].bottom < 0:
+                expired.append(entity)
+                events.publish(ExpiredEvent(world["tick"], entity["name"], "offscreen"))
+                continue
+        if entity["can_shoot"] and not entity["is_controllable"]:
+            _try_fire(world, entity)
+    return expired
+
+
+def _projectile_hits(world, projectiles, targets, removed_ids):
+    """
+    Applies hits of projectiles on targets, swept over this step's motion so fast
+    projectiles can't tunnel. Each projectile hits the target it reaches first;
+    destroyed targets absorb nothing more. Returns the projectiles that hit something.
+    """
+    events = world["events"]
+    tick = world["tick"]
+    hits = swept_narrow_phase(swept_broad_phase_pairs(projectiles, targets), projectiles, targets)
+    hits.sort(key=lambda hit: hit[2])
+    spent = []
+    hit_projectiles = set()
+    for projectile_index, target_index, _ in hits:
+        projectile = projectiles[projectile_index]
+        target_entity = targets[target_index]
+        if projectile_index in hit_projectiles or id(target_entity) in removed_ids:
+            continue
+        hit_projectiles.add(projectile_index)
+        spent.append(projectile)
+        events.publish(CollisionEvent(tick, projectile["name"], projectile["type"], target_entity["name"], target_entity["type"]))
+
+        # Player shots damage enemies; hostile shots damage the player
+        if target_entity["type"] in ("enemy", "player") and target_entity["health_points"] is not None:
+            target_entity["health_points"] -= projectile["damage"]
+            events.publish(DamageEvent(tick, projectile["name"], target_entity["name"], projectile["damage"], target_entity["health_points"]))
+            if target_entity["health_points"] <= 0:
+                removed_ids.add(id(target_entity))
+                events.publish(DestroyedEvent(tick, target_entity["name"], target_entity["type"], projectile["name"]))
+    return spent
+
+
+def _resolve_collisions(world, removed_ids):
+    """Resolves player contacts and projectile hits. Destroyed entities are added to removed_ids."""
+    player_entity = world["player"]
+    events = world["events"]
+    tick = world["tick"]
+    hostile_targets = [] # Everything player shots can hit: not the player itself
+    for entity in world["entities"]:
+        if entity is not player_entity and id(entity) not in removed_ids:
+            hostile_targets.append(entity)
+
+    # 1. Player vs. Other Entities
+    if player_entity:
+        for _, target_index in narrow_phase(broad_phase_pairs([player_entity], hostile_targets), [player_entity], hostile_targets):
+            entity = hostile_targets[target_index]
+            events.publish(CollisionEvent(tick, player_entity["name"], player_entity["type"], entity["name"], entity["type"]))
+            # Placeholder for player damage logic on contact
+
+    # 2. Projectiles vs. entities of the other team
+    projectiles = world["projectiles"]
+    if projectiles:
+        player_shots = []
+        hostile_shots = []
+        for projectile in projectiles:
+            (player_shots if projectile["team"] == "player" else hostile_shots).append(projectile)
+        spent = _projectile_hits(world, player_shots, hostile_targets, removed_ids)
+        if player_entity and hostile_shots:
+            spent += _projectile_hits(world, hostile_shots, [player_entity], removed_ids)
+        if spent:
+            spent_ids = {id(projectile) for projectile in spent}
+            world["projectiles"] = [projectile for projectile in world["projectiles"] if id(projectile) not in spent_ids]
+
+
+def step_world(world, dt, controls=NO_CONTROLS):
+    """
+    Advances the world by one fixed simulation step of dt seconds.
+    Positions from before the step are kept in prev_x/prev_y for render interpolation.
+    """
+    for entity in world["entities"]:
+        entity["prev_x"] = entity["x"]
+        entity["prev_y"] = entity["y"]
+
+    world["tick"] += 1
+    world["time_ms"] += dt * 1000.0
+
+    if world["spawning"]["queue"]:
+        _run_spawners(world)
+
+    if world["player"]:
+        _update_player(world, world["player"], dt, controls)
+
+    removed_ids = {id(entity) for entity in _update_entities(world, dt)}
+    _update_projectiles(world, dt)
+    _resolve_collisions(world, removed_ids)
+
+    # Remove entities marked for removal
+    if removed_ids:
+        kept = []
+        for entity in world["entities"]:
+            if id(entity) not in removed_ids:
+                kept.append(entity)
+            elif entity["spawner_index"] is not None:
+                _release_spawned(world, entity)
+        world["entities"] = kept
+        # Update player reference if it was removed (e.g. game over)
+        if world["player"] is not None and id(world["player"]) in removed_ids:
+            world["player"] = None